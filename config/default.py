@@ -15,6 +15,8 @@ DATABASE_USER = 'openatlas'
 DATABASE_HOST = 'localhost'
 DATABASE_PORT = 5432
 DATABASE_PASS = 'CHANGE ME'
+DATABASE_POOL_MIN = 5  # Connections kept open per process
+DATABASE_POOL_MAX = 25
 MAIL_PASSWORD = 'CHANGE ME'
 SECRET_KEY = 'CHANGE ME'
 
@@ -1798,6 +1798,34 @@ ALTER TABLE ONLY model.link
     ADD CONSTRAINT link_pkey PRIMARY KEY (id);
 
 
+--
+-- Name: entity_begin_from_end_to_idx; Type: INDEX; Schema: model; Owner: openatlas
+--
+
+CREATE INDEX entity_begin_from_end_to_idx ON model.entity USING btree (begin_from, end_to);
+
+
+--
+-- Name: entity_system_class_idx; Type: INDEX; Schema: model; Owner: openatlas
+--
+
+CREATE INDEX entity_system_class_idx ON model.entity USING btree (system_class);
+
+
+--
+-- Name: link_domain_id_idx; Type: INDEX; Schema: model; Owner: openatlas
+--
+
+CREATE INDEX link_domain_id_idx ON model.link USING btree (domain_id);
+
+
+--
+-- Name: link_range_id_idx; Type: INDEX; Schema: model; Owner: openatlas
+--
+
+CREATE INDEX link_range_id_idx ON model.link USING btree (range_id);
+
+
 --
 -- Name: property property_code_key; Type: CONSTRAINT; Schema: model; Owner: openatlas
 --
@@ -0,0 +1,16 @@
+-- Upgrade 6.1.x to 6.2.0
+-- Be sure to backup the database and read the upgrade notes before executing this!
+
+BEGIN;
+
+-- Index for date criteria of the full text search
+CREATE INDEX IF NOT EXISTS entity_begin_from_end_to_idx ON model.entity (begin_from, end_to);
+
+-- Indexes for link lookups, e.g. the orphan check
+CREATE INDEX IF NOT EXISTS link_domain_id_idx ON model.link (domain_id);
+CREATE INDEX IF NOT EXISTS link_range_id_idx ON model.link (range_id);
+
+-- Index for the overview counts so they come from an index only scan
+CREATE INDEX IF NOT EXISTS entity_system_class_idx ON model.entity (system_class);
+
+END;
@@ -1,12 +1,16 @@
 import locale
 import os
 import sys
-from typing import Any
+from functools import lru_cache
+from typing import Any, Optional
 
 from flask import Flask, Response, g, request, session
+from werkzeug.datastructures import LanguageAccept
+from werkzeug.http import parse_accept_header
 from flask_babel import Babel
 from flask_wtf.csrf import CSRFProtect
 
+from openatlas import bootstrap
 from openatlas.database.connect import close_connection, open_connection
 
 app: Flask = Flask(__name__, instance_relative_config=True)
@@ -40,35 +44,51 @@ from openatlas.api.v02 import routes  # New routes
 from openatlas.api.v02.resources import parser
 
 
+LANGUAGE_KEYS = tuple(app.config['LANGUAGES'])
+
+
+@lru_cache(maxsize=256)
+def best_language_match(accept_header: str) -> Optional[str]:
+    # Accept-Language headers repeat heavily, so parsing and scoring them
+    # against the available languages is cached per header string
+    return parse_accept_header(accept_header, LanguageAccept).best_match(LANGUAGE_KEYS)
+
+
 @babel.localeselector
 def get_locale() -> str:
     if 'language' in session:
         return session['language']
-    best_match = request.accept_languages.best_match(app.config['LANGUAGES'].keys())
+    best_match = best_language_match(request.headers.get('Accept-Language', ''))
     return best_match if best_match else session['settings']['default_language']
 
 
+# API routes which only run their own SQL and never touch the model metadata in g
+API_WITHOUT_MODEL = ('/api/0.2/content/', '/api/0.2/overview_count/')
+
+
 @app.before_request
 def before_request() -> None:
-    from openatlas.models.model import CidocClass, CidocProperty
-    from openatlas.models.node import Node
-    from openatlas.models.settings import Settings
-    from openatlas.models.reference_system import ReferenceSystem
     if request.path.startswith('/static'):  # pragma: no cover
         return  # Only needed if not running with Apache and static alias
     open_connection(app.config)
-    session['settings'] = Settings.get_settings()
+    if request.path in API_WITHOUT_MODEL:
+        session['settings'] = bootstrap.load_settings()  # Still needed for api_access
+        session['language'] = get_locale()
+        return
+    data = bootstrap.load()
+    session['settings'] = data['settings']
     session['language'] = get_locale()
-    g.cidoc_classes = CidocClass.get_all()
-    g.properties = CidocProperty.get_all()
-
-    from openatlas.models import system
-    g.table_headers = system.get_table_headers()
-    g.classes = system.get_system_classes()
-    g.view_class_mapping = system.view_class_mapping
-    g.class_view_mapping = system.get_class_view_mapping()
-    g.nodes = Node.get_all_nodes()
-    g.reference_systems = ReferenceSystem.get_all()
+    g.cidoc_classes = data['cidoc_classes']
+    g.properties = data['properties']
+    # Copied per request because views mutate their header lists in place
+    g.table_headers = {name: list(header) for name, header in data['table_headers'].items()}
+    g.classes = data['classes']
+    g.view_class_mapping = data['view_class_mapping']
+    g.class_view_mapping = data['class_view_mapping']
+    g.nodes = data['nodes']
+    g.node_hierarchies = data['node_hierarchies']
+    g.license_node_ids = data['license_node_ids']
+    g.reference_systems = data['reference_systems']
 
     # Set max file upload in MB
     app.config['MAX_CONTENT_LENGTH'] = session['settings']['file_upload_max_size'] * 1024 * 1024
@@ -85,7 +105,7 @@ def apply_caching(response: Response) -> Response:
 
 @app.teardown_request
 def teardown_request(exception: Any) -> None:
-    close_connection()
+    close_connection(discard=exception is not None)
 
 
 app.register_blueprint(filters.blueprint)
@@ -1,13 +1,12 @@
 from typing import Any
 
-from flask import send_file, send_from_directory
+from flask import g, send_file, send_from_directory
 from flask_cors import cross_origin
 
 from openatlas import app
 from openatlas.api.v02.resources.error import AccessDeniedError, ResourceGoneError
 from openatlas.api.v02.resources.parser import image_parser
 from openatlas.models.entity import Entity
-from openatlas.models.node import Node
 from openatlas.util.util import api_access
 
 
@@ -18,10 +17,8 @@ def display_file_api(filename: str) -> Any:  # pragma: no cover
     parser = image_parser.parse_args()
     from pathlib import Path as Pathlib_path
     entity = Entity.get_by_id(int(Pathlib_path(filename).stem), nodes=True)
-    license_ = None
-    for node in entity.nodes:
-        if node.root and node.root[-1] == Node.get_hierarchy('License').id:
-            license_ = node.name
+    license_ = next(
+        (node.name for node in entity.nodes if node.id in g.license_node_ids), None)
     if not license_:
         raise AccessDeniedError
     if parser['download']:
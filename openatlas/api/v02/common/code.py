@@ -1,7 +1,7 @@
 from typing import Any, Dict, List, Tuple, Union
 
 from flask import Response, g, jsonify
-from flask_restful import Resource, marshal
+from flask_restful import Resource
 
 from openatlas.api.export.csv_export import ApiExportCSV
 from openatlas.api.v02.resources.download import Download
@@ -9,6 +9,7 @@ from openatlas.api.v02.resources.error import InvalidCodeError
 from openatlas.api.v02.resources.pagination import Pagination
 from openatlas.api.v02.resources.parser import entity_parser
 from openatlas.api.v02.resources.sql import Query
+from openatlas.api.v02.resources.util import json_response
 from openatlas.api.v02.templates.geojson import GeoJson
 from openatlas.models.entity import Entity
 from openatlas.util.util import api_access
@@ -30,7 +31,7 @@ class GetByCode(Resource):  # type: ignore
             return jsonify(code_['pagination']['entities'])
         if parser['download']:
             return Download.download(data=code_, template=template, name=code)
-        return marshal(code_, template), 200
+        return json_response(code_)
 
     @staticmethod
     def get_entities_by_view(code_: str, parser: Dict[str, Any]) -> List[Entity]:
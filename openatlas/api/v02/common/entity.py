@@ -1,12 +1,13 @@
 from typing import Tuple, Union
 
 from flask import Response
-from flask_restful import Resource, marshal
+from flask_restful import Resource
 
 from openatlas.api.export.csv_export import ApiExportCSV
 from openatlas.api.v02.resources.download import Download
 from openatlas.api.v02.resources.geojson_entity import GeoJsonEntity
 from openatlas.api.v02.resources.parser import entity_parser
+from openatlas.api.v02.resources.util import json_response
 from openatlas.api.v02.templates.geojson import GeoJson
 from openatlas.util.util import api_access
 
@@ -22,4 +23,4 @@ class GetEntity(Resource):  # type: ignore
         template = GeoJson.geojson_template(parser['show'])
         if parser['download']:
             return Download.download(data=entity, template=template, name=id_)
-        return marshal(entity, GeoJson.geojson_template(parser['show'])), 200
+        return json_response(entity)
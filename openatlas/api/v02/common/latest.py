@@ -1,14 +1,16 @@
 from typing import Any, Dict, List, Tuple, Union
 
 from flask import Response, jsonify
-from flask_restful import Resource, marshal
+from flask_restful import Resource
 
 from openatlas.api.v02.resources.download import Download
 from openatlas.api.v02.resources.error import InvalidLimitError
 from openatlas.api.v02.resources.geojson_entity import GeoJsonEntity
 from openatlas.api.v02.resources.parser import entity_parser
+from openatlas.api.v02.resources.util import json_response
 from openatlas.api.v02.templates.geojson import GeoJson
 from openatlas.models.entity import Entity
+from openatlas.models.link import Link
 from openatlas.util.util import api_access
 
 
@@ -23,14 +25,21 @@ class GetLatest(Resource):  # type: ignore
             return jsonify(len(entities))
         if parser['download']:
             return Download.download(data=entities, template=template, name=latest)
-        return marshal(entities, template), 200
+        return json_response(entities)
 
     @staticmethod
     def get_entities_get_latest(limit_: int, parser: Dict[str, Any]) -> List[Dict[str, Any]]:
         entities = []
         if 0 < limit_ < 101:
-            for entity in Entity.get_latest(limit_):
-                entities.append(GeoJsonEntity.get_entity(entity, parser))
+            parser['show'] = frozenset(parser['show'])  # O(1) membership tests per entity
+            latest = Entity.get_latest(limit_)
+            ids = [entity.id for entity in latest]
+            links = Link.get_links_bulk(ids)
+            links_inverse = Link.get_links_bulk(ids, inverse=True)
+            geoms = GeoJsonEntity.get_geometries(latest, links, parser)
+            for entity in latest:
+                entities.append(GeoJsonEntity.get_entity(
+                    entity, parser, links[entity.id], links_inverse[entity.id], geoms))
             return entities
         else:
             raise InvalidLimitError  # pragma: no cover
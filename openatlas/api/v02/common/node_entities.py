@@ -7,6 +7,7 @@ from openatlas.api.v02.resources.download import Download
 from openatlas.api.v02.resources.error import InvalidSubunitError
 from openatlas.api.v02.resources.parser import default_parser
 from openatlas.api.v02.templates.nodes import NodeTemplate
+from openatlas.models.node import Node
 from openatlas.util.util import api_access
 
 
@@ -15,22 +16,22 @@ class GetNodeEntities(Resource):  # type: ignore
     # @swag_from("../swagger/nodes.yml", endpoint="node_entities")
     def get(self, id_: int) -> Union[Tuple[Resource, int], Response]:
         parser = default_parser.parse_args()
+        if id_ not in g.nodes:
+            raise InvalidSubunitError  # pragma: no cover
+        if parser['count']:  # Count in SQL instead of fetching everything
+            return jsonify(Node.count_entities_of_nodes([id_]))
+        if parser['download']:  # Stream from a server side cursor to bound memory
+            return Download.stream_nodes(Node.stream_entities_of_nodes([id_]), id_)
         node = {"nodes": GetNodeEntities.get_node(id_)}
-        template = NodeTemplate.node_template()
-        if parser['count']:
-            return jsonify(len(node['nodes']))
-        if parser['download']:
-            return Download.download(data=node, template=template, name=id_)
-        return marshal(node, template), 200
+        return marshal(node, NodeTemplate.node_template()), 200
 
     @staticmethod
     def get_node(id_: int) -> List[Dict[str, Any]]:
         if id_ not in g.nodes:
             raise InvalidSubunitError  # pragma: no cover
-        entities = g.nodes[id_].get_linked_entities(['P2', 'P89'], inverse=True)
         data = []
-        for e in entities:
+        for row in Node.get_entities_of_nodes([id_]):
             data.append({
-                'id': e.id, 'label': e.name,
-                'url': url_for('entity', id_=e.id, _external=True)})
+                'id': row['id'], 'label': row['name'],
+                'url': url_for('entity', id_=row['id'], _external=True)})
         return data
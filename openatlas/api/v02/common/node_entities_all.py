@@ -7,6 +7,7 @@ from openatlas.api.v02.resources.download import Download
 from openatlas.api.v02.resources.error import InvalidSubunitError
 from openatlas.api.v02.resources.parser import default_parser
 from openatlas.api.v02.templates.nodes import NodeTemplate
+from openatlas.models.node import Node
 from openatlas.util.util import api_access
 
 
@@ -15,28 +16,27 @@ class GetNodeEntitiesAll(Resource):  # type: ignore
     # @swag_from("../swagger/nodes_all.yml", endpoint="node_entities_all")
     def get(self, id_: int) -> Union[Tuple[Resource, int], Response]:
         parser = default_parser.parse_args()
+        if id_ not in g.nodes:
+            raise InvalidSubunitError  # pragma: no cover
+        if parser['count']:  # Count in SQL instead of fetching everything
+            return jsonify(Node.count_entities_of_nodes(GetNodeEntitiesAll.get_node_ids(id_)))
+        if parser['download']:  # Stream from a server side cursor to bound memory
+            return Download.stream_nodes(
+                Node.stream_entities_of_nodes(GetNodeEntitiesAll.get_node_ids(id_)), id_)
         node = {"nodes": GetNodeEntitiesAll.get_node_all(id_)}
-        template = NodeTemplate.node_template()
-        if parser['count']:
-            return jsonify(len(node['nodes']))
-        if parser['download']:
-            return Download.download(data=node, template=template, name=id_)
-        return marshal(node, template), 200
+        return marshal(node, NodeTemplate.node_template()), 200
+
+    @staticmethod
+    def get_node_ids(id_: int) -> List[int]:
+        return [id_] + Node.get_all_sub_ids(g.nodes[id_])
 
     @staticmethod
     def get_node_all(id_: int) -> List[Dict[str, Any]]:
         if id_ not in g.nodes:
             raise InvalidSubunitError  # pragma: no cover
-        return GetNodeEntitiesAll.get_recursive_node_entities(id_, [])
-
-    @staticmethod
-    def get_recursive_node_entities(id_: int, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        entities = g.nodes[id_].get_linked_entities(['P2', 'P89'], inverse=True)
-        for e in entities:
+        data = []
+        for row in Node.get_entities_of_nodes(GetNodeEntitiesAll.get_node_ids(id_)):
             data.append({
-                'id': e.id, 'label': e.name,
-                'url': url_for('entity', id_=e.id, _external=True)})
-        node = g.nodes[id_]
-        for sub_id in node.subs:
-            GetNodeEntitiesAll.get_recursive_node_entities(sub_id, data)
+                'id': row['id'], 'label': row['name'],
+                'url': url_for('entity', id_=row['id'], _external=True)})
         return data
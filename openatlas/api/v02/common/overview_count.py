@@ -1,19 +1,13 @@
-from typing import Tuple, Union
-
 from flask import Response
-from flask_restful import Resource, marshal
 
-from openatlas.api.v02.templates.overview_count import OverviewCountTemplate
+from openatlas.api.v02.resources.util import json_response
 from openatlas.models.entity import Entity
 from openatlas.util.util import api_access
 
 
-class OverviewCount(Resource):  # type: ignore
-    @api_access()  # type: ignore
-    # @swag_from("../swagger/overview_count.yml", endpoint="overview_count")
-    def get(self) -> Union[Tuple[Resource, int], Response]:
-        overview = []
-        for name, count in Entity.get_overview_counts().items():
-            overview.append({'systemClass': name, 'count': count})
-        template = OverviewCountTemplate.overview_template()
-        return marshal(overview, template), 200
+@api_access()  # type: ignore
+# @swag_from("../swagger/overview_count.yml", endpoint="overview_count")
+def overview_count() -> Response:
+    return json_response([
+        {'systemClass': name, 'count': count}
+        for name, count in Entity.get_overview_counts().items()])
@@ -1,7 +1,7 @@
 from typing import Tuple, Union
 
 from flask import Response, jsonify
-from flask_restful import Resource, marshal
+from flask_restful import Resource
 
 from openatlas.api.v02.common.class_ import GetByClass
 from openatlas.api.v02.common.code import GetByCode
@@ -11,6 +11,7 @@ from openatlas.api.v02.resources.error import QueryEmptyError
 from openatlas.api.v02.resources.geojson_entity import GeoJsonEntity
 from openatlas.api.v02.resources.pagination import Pagination
 from openatlas.api.v02.resources.parser import query_parser
+from openatlas.api.v02.resources.util import json_response
 from openatlas.api.v02.templates.geojson import GeoJson
 from openatlas.util.util import api_access
 
@@ -26,8 +27,7 @@ class GetQuery(Resource):  # type: ignore
             raise QueryEmptyError  # pragma: no cover
         template = GeoJson.pagination(parser['show'])
         if parser['entities']:
-            for entity in parser['entities']:
-                entities.append(GeoJsonEntity.get_entity_by_id(entity))
+            entities.extend(GeoJsonEntity.get_entities_by_ids(parser['entities']))
         if parser['codes']:
             for code_ in parser['codes']:
                 entities.extend(GetByCode.get_entities_by_view(code_=code_, parser=parser))
@@ -43,4 +43,4 @@ class GetQuery(Resource):  # type: ignore
             return jsonify(output['pagination']['entities'])
         if parser['download']:
             return Download.download(data=output, template=template, name='query')
-        return marshal(output, template), 200
+        return json_response(output)
@@ -1,7 +1,7 @@
 from typing import Any, Dict, List, Tuple, Union
 
 from flask import Response, g, jsonify
-from flask_restful import Resource, marshal
+from flask_restful import Resource
 
 from openatlas.api.export.csv_export import ApiExportCSV
 from openatlas.api.v02.resources.download import Download
@@ -9,6 +9,7 @@ from openatlas.api.v02.resources.error import InvalidCodeError
 from openatlas.api.v02.resources.pagination import Pagination
 from openatlas.api.v02.resources.parser import entity_parser
 from openatlas.api.v02.resources.sql import Query
+from openatlas.api.v02.resources.util import json_response
 from openatlas.api.v02.templates.geojson import GeoJson
 from openatlas.models.entity import Entity
 from openatlas.util.util import api_access
@@ -31,7 +32,7 @@ class GetBySystemClass(Resource):  # type: ignore
             return jsonify(system_class_['pagination']['entities'])
         if parser['download']:
             return Download.download(data=system_class_, template=template, name=system_class)
-        return marshal(system_class_, template), 200
+        return json_response(system_class_)
 
     @staticmethod
     def get_entities_by_system_class(system_class: str, parser: Dict[str, Any]) -> List[Entity]:
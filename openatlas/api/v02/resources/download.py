@@ -1,10 +1,12 @@
 import json
-from typing import Any, Dict, List, Type, Union
+from typing import Any, Dict, Iterator, List, Type, Union
 
-from flask import Response
+from flask import Response, stream_with_context
 from flask_restful import marshal
 from flask_restful.fields import List as RestList, String
 
+from openatlas.api.v02.resources.geojson_entity import GeoJsonEntity
+from openatlas.api.v02.resources.util import dumps_str
 from openatlas.models.entity import Entity
 
 
@@ -19,3 +21,27 @@ class Download:
                         mimetype='application/json',
                         headers={
                             'Content-Disposition': 'attachment;filename=' + str(name) + '.json'})
+
+    @staticmethod
+    def stream_nodes(batches: Iterator[List[Dict[str, Any]]], name: Union[str, int]) -> Response:
+        """ Stream a node entity listing so that a whole (possibly huge) type
+        is never held in memory, neither as rows nor as serialized JSON."""
+        entity_url = GeoJsonEntity.get_url_format('entity')
+
+        def generate() -> Iterator[str]:
+            yield '{"nodes": ['
+            separator = ''
+            for batch in batches:
+                yield separator + ','.join(
+                    dumps_str({
+                        'id': row['id'],
+                        'label': row['name'],
+                        'url': entity_url % row['id']})
+                    for row in batch)
+                separator = ','
+            yield ']}'
+
+        return Response(stream_with_context(generate()),
+                        mimetype='application/json',
+                        headers={
+                            'Content-Disposition': 'attachment;filename=' + str(name) + '.json'})
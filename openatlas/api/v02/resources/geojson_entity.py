@@ -14,98 +14,131 @@ from openatlas.util.display import get_file_path
 class GeoJsonEntity:
 
     @staticmethod
-    def get_links(entity: Entity) -> Optional[List[Dict[str, str]]]:
-        links = []
-        for link in Link.get_links(entity.id):
-            links.append({
+    def get_url_format(endpoint: str) -> str:
+        """ url_for is expensive, so for routes taking only an integer id the
+        URL is built once per request and links use plain %d formatting."""
+        if not hasattr(g, 'url_formats'):
+            g.url_formats = {}
+        if endpoint not in g.url_formats:
+            g.url_formats[endpoint] = \
+                url_for(endpoint, id_=0, _external=True).rsplit('/', 1)[0] + '/%d'
+        return g.url_formats[endpoint]
+
+    @staticmethod
+    def get_links(entity: Entity,
+                  links: List[Link],
+                  links_inverse: List[Link]) -> Optional[List[Dict[str, str]]]:
+        relations = []
+        entity_url = GeoJsonEntity.get_url_format('entity')
+        for link in links:
+            relations.append({
                 'label': link.range.name,
-                'relationTo': url_for('entity', id_=link.range.id, _external=True),
-                'relationType': 'crm:' + link.property.code + '_'
-                                + link.property.i18n['en'].replace(' ', '_'),
+                'relationTo': entity_url % link.range.id,
+                'relationType': link.property.relation_type,
                 'relationSystemClass': link.range.class_.name,
                 'type': link.type.name if link.type else None,
                 'when': {'timespans': [GeoJsonEntity.get_time(link)]}})
-        for link in Link.get_links(entity.id, inverse=True):
-            link_property = link.property.i18n_inverse['en'] if link.property.i18n_inverse[
-                'en'] else link.property.i18n['en']
-            links.append({
+        for link in links_inverse:
+            relations.append({
                 'label': link.domain.name,
-                'relationTo': url_for('entity', id_=link.domain.id, _external=True),
-                'relationType': 'crm:' + link.property.code + 'i_'
-                                + link_property.replace(' ', '_'),
+                'relationTo': entity_url % link.domain.id,
+                'relationType': link.property.relation_type_inverse,
                 'relationSystemClass': link.domain.class_.name,
                 'type': link.type.name if link.type else None,
                 'when': {'timespans': [GeoJsonEntity.get_time(link)]}})
-        return links if links else None
+        return relations if relations else None
 
     @staticmethod
-    def get_file(entity: Entity) -> Optional[List[Dict[str, str]]]:
+    def get_file(entity: Entity, p67_inverse: List[Link]) -> Optional[List[Dict[str, str]]]:
         files = []
-        for link in Link.get_links(entity.id, codes="P67", inverse=True):
+        for link in p67_inverse:
             if link.domain.class_.name == 'file':
                 path = get_file_path(link.domain.id)
                 files.append({
-                    '@id': url_for('entity', id_=link.domain.id, _external=True),
+                    '@id': GeoJsonEntity.get_url_format('entity') % link.domain.id,
                     'title': link.domain.name,
-                    'license': GeoJsonEntity.get_license(link.domain.id),
+                    'license': GeoJsonEntity.get_license(link.domain),
                     'url': url_for(
                         'display_file_api', filename=path.name, _external=True) if path else "N/A"})
         return files if files else None
 
     @staticmethod
-    def get_license(entity_id: int) -> str:
-        file_license = ""
-        for link in Link.get_links(entity_id):
-            if link.property.code == "P2":
-                file_license = link.range.name
-        return file_license
+    def get_license(entity: Entity) -> str:
+        # Files come in with their nodes loaded, so no extra query is needed
+        return next(
+            (node.name for node in entity.nodes if node.id in g.license_node_ids), '')
 
     @staticmethod
-    def get_node(entity: Entity) -> Optional[List[Dict[str, Any]]]:
+    def get_node(entity: Entity, links: List[Link]) -> Optional[List[Dict[str, Any]]]:
         nodes = []
+        entity_url = GeoJsonEntity.get_url_format('entity')
+        p2_by_range = {
+            link.range.id: link for link in links
+            if link.property.code == 'P2' and link.description}
         for node in entity.nodes:
             nodes_dict = {
-                'identifier': url_for('entity', id_=node.id, _external=True),
-                'label': node.name}
-            for link in Link.get_links(entity.id):
-                if link.range.id == node.id and link.description:
-                    nodes_dict['value'] = link.description
-                    if link.range.id == node.id and node.description:
-                        nodes_dict['unit'] = node.description
-            hierarchy = []
-            for root in node.root:
-                hierarchy.append(g.nodes[root].name)
-            hierarchy.reverse()
-            nodes_dict['hierarchy'] = ' > '.join(map(str, hierarchy))
+                'identifier': entity_url % node.id,
+                'label': node.name,
+                'description': None,
+                'hierarchy': g.node_hierarchies[node.id],
+                'value': None,
+                'unit': None}
+            link = p2_by_range.get(node.id)
+            if link:
+                nodes_dict['value'] = float(link.description)
+                if node.description:
+                    nodes_dict['unit'] = node.description
             nodes.append(nodes_dict)
         return nodes if nodes else None
 
     @staticmethod
     def get_time(entity: Union[Entity, Link]) -> Optional[Dict[str, Any]]:
-        time = {}
-        start = {
-            'earliest': entity.begin_from,
-            'latest': entity.begin_to,
-            'comment': entity.begin_comment}
-        time['start'] = start
-        end = {
-            'earliest': entity.end_from,
-            'latest': entity.end_to,
-            'comment': entity.end_comment}
-        time['end'] = end
-        return time if time else None
+        return {
+            'start': {
+                'earliest': str(entity.begin_from) if entity.begin_from else None,
+                'latest': str(entity.begin_to) if entity.begin_to else None},
+            'end': {
+                'earliest': str(entity.end_from) if entity.end_from else None,
+                'latest': str(entity.end_to) if entity.end_to else None}}
+
+    @staticmethod
+    def get_geoms_by_entity(
+            location_id: int,
+            geoms: Optional[Dict[int, List[Dict[str, Any]]]] = None) -> Union[str, Dict[str, Any]]:
+        geometries = geoms[location_id] if geoms is not None else Gis.get_by_id(location_id)
+        if len(geometries) == 1:
+            return geometries[0]
+        return {'type': 'GeometryCollection', 'geometries': geometries}
+
+    @staticmethod
+    def get_location_id(entity: Entity, links: List[Link]) -> Optional[int]:
+        if entity.class_.name == 'object_location':
+            return entity.id
+        if entity.class_.view == 'place' or entity.class_.name in ['find', 'artifact']:
+            for link in links:
+                if link.property.code == 'P53':
+                    return link.range.id
+        return None
 
     @staticmethod
-    def get_geoms_by_entity(entity: Entity) -> Union[str, Dict[str, Any]]:
-        geoms = Gis.get_by_id(entity.id)
-        if len(geoms) == 1:
-            return geoms[0]
-        return {'type': 'GeometryCollection', 'geometries': geoms}
+    def get_geometries(entities: List[Entity],
+                       links: Dict[int, List[Link]],
+                       parser: Dict[str, Any]) -> Dict[int, List[Dict[str, Any]]]:
+        """ Pre-fetch the geometries of a batch of entities with one query."""
+        location_ids = []
+        if 'geometry' in parser['show']:
+            for entity in entities:
+                location_id = GeoJsonEntity.get_location_id(entity, links[entity.id])
+                if location_id:
+                    location_ids.append(location_id)
+        return Gis.get_by_ids(location_ids)
 
     @staticmethod
-    def get_reference_systems(entity: Entity) -> Optional[List[Dict[str, Union[str, Any]]]]:
+    def get_reference_systems(
+            entity: Entity,
+            p67_inverse: List[Link]) -> Optional[List[Dict[str, Union[str, Any]]]]:
         ref = []
-        for link in Link.get_links(entity.id, codes="P67", inverse=True):
+        for link in p67_inverse:
             if isinstance(link.domain, ReferenceSystem):
                 system = g.reference_systems[link.domain.id]
                 ref.append({
@@ -124,55 +157,62 @@ class GeoJsonEntity:
         return entity
 
     @staticmethod
-    def get_entity(entity: Entity, parser: Dict[str, Any]) -> Dict[str, Any]:
-        type_ = 'FeatureCollection'
-        class_code = ''.join(entity.cidoc_class.code + " " + entity.cidoc_class.i18n['en']).replace(
-            " ", "_")
+    def get_entities_by_ids(ids: List[int]) -> List[Entity]:
+        entities = Entity.get_by_ids(ids, nodes=True, aliases=True)
+        if not entities:  # pragma: nocover
+            raise EntityDoesNotExistError
+        return entities
+
+    @staticmethod
+    def get_entity(entity: Entity,
+                   parser: Dict[str, Any],
+                   links: Optional[List[Link]] = None,
+                   links_inverse: Optional[List[Link]] = None,
+                   geoms: Optional[Dict[int, List[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        # Links and geometries can be passed in pre-fetched (see get_links_bulk
+        # and get_geometries) to avoid per entity queries when building many
+        # features at once
+        if links is None:
+            links = Link.get_links(entity.id)
+        if links_inverse is None:
+            links_inverse = Link.get_links(entity.id, inverse=True)
+        show = parser['show']
+
+        # Files and reference systems share the P67 inverse links
+        p67_inverse = [
+            link for link in links_inverse if link.property.code == 'P67'] \
+            if 'depictions' in show or 'links' in show else []
+
+        geometry = None
+        if 'geometry' in show:
+            location_id = GeoJsonEntity.get_location_id(entity, links)
+            if location_id:
+                geometry = GeoJsonEntity.get_geoms_by_entity(location_id, geoms)
+
+        # Built as one literal to keep allocations low on bulk endpoints
         features = {
-            '@id': url_for('entity_view', id_=entity.id, _external=True),
+            '@id': GeoJsonEntity.get_url_format('entity_view') % entity.id,
             'type': 'Feature',
-            'crmClass': "crm:" + class_code,
+            'crmClass': entity.cidoc_class.crm_class,
             'system_class': entity.class_.name,
-            'properties': {'title': entity.name}}
-
-        # Descriptions
-        if entity.description:
-            features['description'] = [{'value': entity.description}]
-
-        # Alias
-        if entity.aliases and 'names' in parser['show']:
-            features['names'] = []
-            for key, value in entity.aliases.items():
-                features['names'].append({"alias": value})
-
-        # Relations
-        features['relations'] = GeoJsonEntity.get_links(entity) if 'relations' in parser[
-            'show'] else None
-
-        # Types
-        features['types'] = GeoJsonEntity.get_node(entity) if 'types' in parser['show'] else None
-
-        # Depictions
-        features['depictions'] = GeoJsonEntity.get_file(entity) if 'depictions' in parser[
-            'show'] else None
-
-        # Time spans
-        features['when'] = {'timespans': [GeoJsonEntity.get_time(entity)]} if 'when' in parser[
-            'show'] else None
-
-        features['links'] = GeoJsonEntity.get_reference_systems(entity) if 'links' in parser[
-            'show'] else None
-
-        # Geometry
-        if 'geometry' in parser['show']:
-            if entity.class_.view == 'place' or entity.class_.name in ['find', 'artifact']:
-                features['geometry'] = GeoJsonEntity.get_geoms_by_entity(
-                    Link.get_linked_entity(entity.id, 'P53'))
-            elif entity.class_.name == 'object_location':
-                features['geometry'] = GeoJsonEntity.get_geoms_by_entity(entity)
+            'properties': {'title': entity.name},
+            'description':
+                [{'value': entity.description}] if entity.description else None,
+            **({'names': [{"alias": value} for value in entity.aliases.values()]
+                if entity.aliases else None} if 'names' in show else {}),
+            'relations': GeoJsonEntity.get_links(
+                entity, links, links_inverse) if 'relations' in show else None,
+            'types': GeoJsonEntity.get_node(entity, links) if 'types' in show else None,
+            'depictions': GeoJsonEntity.get_file(
+                entity, p67_inverse) if 'depictions' in show else None,
+            'when': {
+                'timespans': [GeoJsonEntity.get_time(entity)]} if 'when' in show else None,
+            'links': GeoJsonEntity.get_reference_systems(
+                entity, p67_inverse) if 'links' in show else None,
+            'geometry': geometry}
 
         data: Dict[str, Any] = {
-            'type': type_,
+            'type': 'FeatureCollection',
             '@context': app.config['API_SCHEMA'],
             'features': [features]}
         return data
@@ -4,6 +4,7 @@ from typing import Any, Dict, List
 from openatlas.api.v02.resources.error import EntityDoesNotExistError, NoEntityAvailable
 from openatlas.api.v02.resources.geojson_entity import GeoJsonEntity
 from openatlas.models.entity import Entity
+from openatlas.models.link import Link
 
 
 class Pagination:
@@ -34,9 +35,16 @@ class Pagination:
         entity_limit = []
         for idx, e in enumerate(entities[h[0]:]):
             entity_limit.append(e)
+        entities_shown = entity_limit[:int(parser['limit'])]
+        parser['show'] = frozenset(parser['show'])  # O(1) membership tests per entity
+        shown_ids = [e.id for e in entities_shown]  # Pre-fetch links for the shown page at once
+        links = Link.get_links_bulk(shown_ids)
+        links_inverse = Link.get_links_bulk(shown_ids, inverse=True)
+        geoms = GeoJsonEntity.get_geometries(entities_shown, links, parser)
         entities_result = []
-        for r in entity_limit[:int(parser['limit'])]:
-            entities_result.append(GeoJsonEntity.get_entity(r, parser))
+        for r in entities_shown:
+            entities_result.append(
+                GeoJsonEntity.get_entity(r, parser, links[r.id], links_inverse[r.id], geoms))
         result = {
             "result": entities_result,
             "pagination": {
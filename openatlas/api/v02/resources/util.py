@@ -0,0 +1,29 @@
+"""
+Helpers to return API data as JSON directly. The GeoJSON dicts are already
+built in the shape the templates describe, so the additional field walk of
+flask_restful's marshal is skipped for hot endpoints. orjson is used for
+serializing if available.
+"""
+from typing import Any, Union
+
+from flask import Response
+
+try:
+    import orjson
+
+    def dumps(data: Any) -> Union[str, bytes]:
+        return orjson.dumps(data)
+except ImportError:  # pragma: no cover
+    import json
+
+    def dumps(data: Any) -> Union[str, bytes]:
+        return json.dumps(data)
+
+
+def dumps_str(data: Any) -> str:
+    result = dumps(data)
+    return result.decode() if isinstance(result, bytes) else result
+
+
+def json_response(data: Any) -> Response:
+    return Response(dumps(data), mimetype='application/json')
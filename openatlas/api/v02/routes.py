@@ -1,3 +1,6 @@
+from typing import Tuple
+
+from flask import Response
 from flask_cors import CORS
 from flask_restful import Api
 
@@ -5,13 +8,13 @@ from openatlas import app
 from openatlas.api.v02.common.class_ import GetByClass
 from openatlas.api.v02.common.class_mapping import ClassMapping
 from openatlas.api.v02.common.code import GetByCode
-from openatlas.api.v02.common.content import GetContent
+from openatlas.api.v02.common.content import get_content
 from openatlas.api.v02.common.entity import GetEntity
 from openatlas.api.v02.common.latest import GetLatest
 from openatlas.api.v02.common.node_entities import GetNodeEntities
 from openatlas.api.v02.common.node_entities_all import GetNodeEntitiesAll
 from openatlas.api.v02.common.node_overview import GetNodeOverview
-from openatlas.api.v02.common.overview_count import OverviewCount
+from openatlas.api.v02.common.overview_count import overview_count
 from openatlas.api.v02.common.query import GetQuery
 from openatlas.api.v02.common.resource_gone import ResourceGone
 from openatlas.api.v02.common.subunit import GetSubunit
@@ -19,7 +22,8 @@ from openatlas.api.v02.common.subunit_hierarchy import GetSubunitHierarchy
 from openatlas.api.v02.common.system_class import GetBySystemClass
 from openatlas.api.v02.common.type_tree import GetTypeTree
 from openatlas.api.v02.common.usage import ShowUsage
-from openatlas.api.v02.resources.error import ResourceGoneError, errors
+from openatlas.api.v02.resources.error import AccessDeniedError, ResourceGoneError, errors
+from openatlas.api.v02.resources.util import json_response
 
 app.config['SWAGGER'] = {
     'openapi': '3.0.2',
@@ -34,14 +38,12 @@ api.add_resource(ShowUsage, '/api/0.2/', '/api/0.2/entity/', '/api/0.2/class/',
                  '/api/0.2/latest/', '/api/0.2/node_entities/', '/api/0.2/node_entities_all/',
                  '/api/0.2/subunit/', '/api/0.2/subunit_hierarchy/', '/api/0.2/system_class/',
                  endpoint='usage')
-api.add_resource(OverviewCount, '/api/0.2/overview_count/', endpoint='overview_count')
 api.add_resource(ClassMapping, '/api/0.2/classes/', endpoint='class_mapping')
 api.add_resource(GetEntity, '/api/0.2/entity/<int:id_>', endpoint='entity')
 api.add_resource(GetByClass, '/api/0.2/class/<string:class_code>', endpoint="class")
 api.add_resource(GetByCode, '/api/0.2/code/<string:code>', endpoint="code")
 api.add_resource(GetBySystemClass, '/api/0.2/system_class/<string:system_class>',
                  endpoint="system_class")
-api.add_resource(GetContent, '/api/0.2/content/', endpoint="content")
 api.add_resource(GetLatest, '/api/0.2/latest/<int:latest>', endpoint="latest")
 api.add_resource(GetNodeOverview, '/api/0.2/node_overview/', endpoint="node_overview")
 api.add_resource(GetNodeEntities, '/api/0.2/node_entities/<int:id_>', endpoint="node_entities")
@@ -53,6 +55,19 @@ api.add_resource(GetSubunitHierarchy, '/api/0.2/subunit_hierarchy/<int:id_>',
 api.add_resource(GetQuery, '/api/0.2/query/', endpoint="query")
 api.add_resource(GetTypeTree, '/api/0.2/type_tree/', endpoint="type_tree")
 
+# Hot and simple endpoints are plain Flask views to skip flask_restful's
+# dispatch, reqparse and marshal overhead
+app.add_url_rule('/api/0.2/content/', 'content', get_content)
+app.add_url_rule('/api/0.2/overview_count/', 'overview_count', overview_count)
+
+
+@app.errorhandler(AccessDeniedError)
+def access_denied(_error: AccessDeniedError) -> Tuple[Response, int]:
+    # The errors dict of flask_restful doesn't cover plain Flask views
+    return json_response({
+        'message': errors['AccessDeniedError']['message'], 'status': 403}), 403
+
+
 api.add_resource(ResourceGone, '/api/0.1/', '/api/0.1/entity/', '/api/0.1/class/',
                  '/api/0.1/code/', '/api/0.1/latest/', '/api/0.1/node_entities/',
                  '/api/0.1/node_entities_all/', '/api/0.1/subunit/', '/api/0.1/subunit_hierarchy/',
@@ -0,0 +1,74 @@
+"""
+Process wide cache for mostly static metadata (CIDOC classes and properties,
+system classes, types, reference systems, settings). It was formerly rebuilt
+with multiple SELECTs in before_request on every hit although it rarely
+changes. Code that changes this data has to call invalidate() so the cache is
+rebuilt with the next request; other processes pick up changes after
+CHECK_INTERVAL seconds at the latest.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from flask import g
+
+CHECK_INTERVAL = 30  # Seconds until other processes re-read changed metadata
+
+_lock = threading.Lock()
+_cache: Optional[Dict[str, Any]] = None
+_loaded: float = 0
+
+
+def load() -> Dict[str, Any]:
+    global _cache, _loaded
+    with _lock:
+        if not _cache or time.time() - _loaded > CHECK_INTERVAL:
+            _cache = _read_from_database()
+            _loaded = time.time()
+    return _cache
+
+
+def load_settings() -> Dict[str, Any]:
+    """ Settings only, for requests that never touch the model metadata in g.
+    A stale or empty cache doesn't trigger a full rebuild here."""
+    with _lock:
+        if _cache and time.time() - _loaded <= CHECK_INTERVAL:
+            return _cache['settings']
+    from openatlas.models.settings import Settings
+    return Settings.get_settings()
+
+
+def invalidate() -> None:
+    global _cache
+    with _lock:
+        _cache = None
+
+
+def _read_from_database() -> Dict[str, Any]:
+    from openatlas.models.model import CidocClass, CidocProperty
+    from openatlas.models.node import Node
+    from openatlas.models.reference_system import ReferenceSystem
+    from openatlas.models.settings import Settings
+    from openatlas.models import system
+    data: Dict[str, Any] = {'settings': Settings.get_settings()}
+
+    # Items depend on each other at creation, e.g. nodes need system classes,
+    # so they are assigned to g already while loading.
+    g.cidoc_classes = data['cidoc_classes'] = CidocClass.get_all()
+    g.properties = data['properties'] = CidocProperty.get_all()
+    g.classes = data['classes'] = system.get_system_classes()
+    data['table_headers'] = system.get_table_headers()
+    data['view_class_mapping'] = system.view_class_mapping
+    data['class_view_mapping'] = system.get_class_view_mapping()
+    g.nodes = data['nodes'] = Node.get_all_nodes()
+    g.node_hierarchies = data['node_hierarchies'] = {  # Pre-built "root > sub" display paths
+        id_: ' > '.join(data['nodes'][root].name for root in reversed(node.root))
+        for id_, node in data['nodes'].items()}
+    license_root = next(
+        (node for node in data['nodes'].values() if node.name == 'License' and not node.root),
+        None)
+    g.license_node_ids = data['license_node_ids'] = frozenset(  # Ids of nodes below "License"
+        id_ for id_, node in data['nodes'].items()
+        if node.root and node.root[-1] == license_root.id) if license_root else frozenset()
+    g.reference_systems = data['reference_systems'] = ReferenceSystem.get_all()
+    return data
@@ -1,27 +1,58 @@
-from typing import Any, Dict
+import threading
+from typing import Any, Dict, Optional
 
 from flask import g
-from psycopg2 import connect, extras
+from psycopg2 import extensions, extras
+from psycopg2.pool import ThreadedConnectionPool
+
+
+class Connection(extensions.connection):
+    """ Adds room for client side state, e.g. which statements are prepared.
+    Plain psycopg2 connections don't allow setting attributes."""
+    prepared = False
+
+
+# The pool is created lazily on first use so that every (worker) process gets
+# its own pool and connections are never shared across a fork. The lock keeps
+# two first concurrent requests from each building a pool, which would leak
+# the loser's connections for the life of the process.
+db_pool: Optional[ThreadedConnectionPool] = None
+_lock = threading.Lock()
 
 
 def open_connection(config: Dict[str, Any]) -> None:
+    global db_pool
+    if not db_pool:
+        with _lock:
+            if not db_pool:
+                db_pool = ThreadedConnectionPool(
+                    config['DATABASE_POOL_MIN'],
+                    config['DATABASE_POOL_MAX'],
+                    database=config['DATABASE_NAME'],
+                    user=config['DATABASE_USER'],
+                    password=config['DATABASE_PASS'],
+                    port=config['DATABASE_PORT'],
+                    host=config['DATABASE_HOST'],
+                    connection_factory=Connection)
     try:
-        g.db = connect(
-            database=config['DATABASE_NAME'],
-            user=config['DATABASE_USER'],
-            password=config['DATABASE_PASS'],
-            port=config['DATABASE_PORT'],
-            host=config['DATABASE_HOST'])
+        g.db = db_pool.getconn()
         g.db.autocommit = True
     except Exception as e:  # pragma: no cover
         print("Database connection failed")
         raise Exception(e)
     g.cursor = g.db.cursor(cursor_factory=extras.DictCursor)
+    if isinstance(g.db, Connection) and not g.db.prepared:
+        # Prepare the hottest statements once per pooled connection to skip
+        # parse and plan on every call
+        from openatlas.database.entity import PREPARED_ENTITY
+        from openatlas.database.link import PREPARED_GET_LINKS
+        g.cursor.execute(PREPARED_GET_LINKS + PREPARED_ENTITY)
+        g.db.prepared = True
 
 
-def close_connection() -> None:
-    if hasattr(g, 'db'):
-        g.db.close()
+def close_connection(discard: bool = False) -> None:
+    if hasattr(g, 'db') and db_pool:
+        db_pool.putconn(g.db, close=discard)  # Discard possibly poisoned connections
 
 
 class Transaction:
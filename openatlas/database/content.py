@@ -10,6 +10,12 @@ class Content:
         g.cursor.execute("SELECT name, language, text FROM web.i18n;")
         return [dict(row) for row in g.cursor.fetchall()]
 
+    @staticmethod
+    def get_translations(names: List[str]) -> List[Dict[str, str]]:
+        sql = "SELECT name, language, text FROM web.i18n WHERE name IN %(names)s;"
+        g.cursor.execute(sql, {'names': tuple(names)})
+        return [dict(row) for row in g.cursor.fetchall()]
+
     @staticmethod
     def update(name: str, language: str, text: str) -> None:
         sql = 'DELETE FROM web.i18n WHERE name = %(name)s AND language = %(language)s'
@@ -1,26 +1,34 @@
-from typing import Any, Dict, Iterable, List, Optional, Union
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
 
 from flask import g
+from psycopg2 import extras
 
 
 class Entity:
 
     @staticmethod
     def get_by_id(id_: int, nodes: bool = False, aliases: bool = False) -> Optional[Dict[str, Any]]:
-        sql = Entity.build_sql(nodes, aliases) + ' WHERE e.id = %(id)s GROUP BY e.id;'
-        g.cursor.execute(sql, {'id': id_})
+        if not nodes and not aliases and getattr(g.db, 'prepared', False):
+            g.cursor.execute('EXECUTE openatlas_get_entity_by_id (%(id)s)', {'id': id_})
+        else:
+            sql = Entity.build_sql(nodes, aliases) + ' WHERE e.id = %(id)s GROUP BY e.id;'
+            g.cursor.execute(sql, {'id': id_})
         return dict(g.cursor.fetchone()) if g.cursor.rowcount else None
 
     @staticmethod
-    def get_by_ids(ids: Iterable[int], nodes: bool = False) -> List[Dict[str, Any]]:
+    def get_by_ids(ids: Iterable[int],
+                   nodes: bool = False,
+                   aliases: bool = False) -> List[Dict[str, Any]]:
         if not ids:
             return []
-        sql = Entity.build_sql(nodes) + ' WHERE e.id IN %(ids)s GROUP BY e.id ORDER BY e.name'
+        sql = Entity.build_sql(nodes, aliases) \
+            + ' WHERE e.id IN %(ids)s GROUP BY e.id ORDER BY e.name'
         g.cursor.execute(sql, {'ids': tuple(ids)})
         return [dict(row) for row in g.cursor.fetchall()]
 
     @staticmethod
-    def get_by_project_id(project_id: int) -> List[Dict[str, Any]]:
+    def get_by_project_id(project_id: int) -> Iterator[Dict[str, Any]]:
         sql = """
             SELECT e.id, ie.origin_id, e.class_code, e.name, e.description, e.created, e.modified,
                 e.system_class,
@@ -31,18 +39,39 @@ class Entity:
             LEFT JOIN model.link t ON e.id = t.domain_id AND t.property_code IN ('P2', 'P89')
             JOIN import.entity ie ON e.id = ie.entity_id
             WHERE ie.project_id = %(id)s GROUP BY e.id, ie.origin_id;"""
-        g.cursor.execute(sql, {'id': project_id})
-        return [dict(row) for row in g.cursor.fetchall()]
+        return Entity.stream(sql, {'id': project_id}, 'entity_project_stream')
 
     @staticmethod
     def get_by_class(classes: Union[str, List[str]],
                      nodes: bool = False,
-                     aliases: bool = False) -> List[Dict[str, Any]]:
+                     aliases: bool = False) -> Iterator[Dict[str, Any]]:
         sql = Entity.build_sql(
             nodes=nodes,
             aliases=aliases) + ' WHERE e.system_class IN %(class)s GROUP BY e.id;'
-        g.cursor.execute(sql, {'class': tuple(classes if isinstance(classes, list) else [classes])})
-        return [dict(row) for row in g.cursor.fetchall()]
+        return Entity.stream(
+            sql,
+            {'class': tuple(classes if isinstance(classes, list) else [classes])},
+            'entity_class_stream')
+
+    @staticmethod
+    def stream(sql: str, params: Dict[str, Any], name: str) -> Iterator[Dict[str, Any]]:
+        # A named (server side) cursor streams rows in batches instead of
+        # buffering possibly huge result sets in libpq before the first row.
+        # withhold because the pooled connection runs in autocommit mode and
+        # psycopg2 refuses named cursors outside transactions otherwise; the
+        # name is unique per call and the finally closes the portal even if
+        # a consumer stops iterating early
+        cursor = g.db.cursor(
+            name=name + '_' + uuid.uuid4().hex,
+            cursor_factory=extras.DictCursor,
+            withhold=True)
+        cursor.itersize = 2000
+        try:
+            cursor.execute(sql, params)
+            for row in cursor:
+                yield dict(row)
+        finally:
+            cursor.close()
 
     @staticmethod
     def get_by_cidoc_class(code: Union[str, List[str]]) -> List[Dict[str, Any]]:
@@ -62,12 +91,15 @@ class Entity:
 
     @staticmethod
     def get_orphans() -> List[Dict[str, Any]]:
-        g.cursor.execute("""
-            SELECT e.id FROM model.entity e
-            LEFT JOIN model.link l1 on e.id = l1.domain_id AND l1.range_id NOT IN
-                (SELECT id FROM model.entity WHERE class_code = 'E55')
-            LEFT JOIN model.link l2 on e.id = l2.range_id
-            WHERE l1.domain_id IS NULL AND l2.range_id IS NULL AND e.class_code != 'E55'""")
+        # NOT EXISTS lets Postgres use the link indexes instead of a seq scan
+        g.cursor.execute(Entity.build_sql() + """
+            WHERE e.class_code != 'E55'
+                AND NOT EXISTS (
+                    SELECT 1 FROM model.link l
+                    JOIN model.entity r ON l.range_id = r.id AND r.class_code != 'E55'
+                    WHERE l.domain_id = e.id)
+                AND NOT EXISTS (SELECT 1 FROM model.link l WHERE l.range_id = e.id)
+            GROUP BY e.id;""")
         return [dict(row) for row in g.cursor.fetchall()]
 
     @staticmethod
@@ -103,8 +135,12 @@ class Entity:
 
     @staticmethod
     def get_profile_image_id(id_: int) -> Optional[int]:
-        sql = 'SELECT i.image_id FROM web.entity_profile_image i WHERE i.entity_id = %(id_)s;'
-        g.cursor.execute(sql, {'id_': id_})
+        if getattr(g.db, 'prepared', False):
+            g.cursor.execute('EXECUTE openatlas_profile_image (%(id_)s)', {'id_': id_})
+        else:
+            g.cursor.execute(
+                'SELECT i.image_id FROM web.entity_profile_image i WHERE i.entity_id = %(id_)s;',
+                {'id_': id_})
         return g.cursor.fetchone()['image_id'] if g.cursor.rowcount else None
 
     @staticmethod
@@ -127,6 +163,10 @@ class Entity:
 
     @staticmethod
     def build_sql(nodes: bool = False, aliases: bool = False) -> str:
+        return SQL_VARIANTS[(nodes, aliases)]  # All four variants are built at import
+
+    @staticmethod
+    def build_sql_variant(nodes: bool, aliases: bool) -> str:
         # Performance: only join nodes and/or aliases if requested
         sql = """
             SELECT
@@ -143,7 +183,8 @@ class Entity:
         if aliases:
             sql += """
                 ,array_to_json(
-                    array_agg((alias.id, alias.name)) FILTER (WHERE alias.name IS NOT NULL)
+                    array_agg((alias.id, alias.name) ORDER BY alias.name)
+                        FILTER (WHERE alias.name IS NOT NULL)
                 ) AS aliases """
         sql += " FROM model.entity e "
         if nodes:
@@ -161,13 +202,36 @@ class Entity:
                classes: List[str],
                desc: bool = False,
                own: bool = False,
-               user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+               user_id: Optional[int] = None,
+               from_date: Optional[str] = None,
+               to_date: Optional[str] = None,
+               include_dateless: bool = True) -> List[Dict[str, Any]]:
+        # Alias rows always pass the date clauses because their dates belong to
+        # the linked actor or place which is checked after resolving it
+        pass_clause = """
+                    OR e.system_class IN ('actor_appellation', 'appellation')"""
+        if include_dateless:
+            pass_clause += """
+                    OR (e.begin_from IS NULL AND e.begin_to IS NULL
+                        AND e.end_from IS NULL AND e.end_to IS NULL)"""
+        date_clause = ''
+        if from_date:
+            date_clause += """
+                AND (e.begin_from >= %(from_date)s OR e.begin_to >= %(from_date)s
+                    OR e.end_from >= %(from_date)s OR e.end_to >= %(from_date)s""" \
+                + pass_clause + ')'
+        if to_date:
+            date_clause += """
+                AND (e.begin_from <= %(to_date)s OR e.begin_to <= %(to_date)s
+                    OR e.end_from <= %(to_date)s OR e.end_to <= %(to_date)s""" \
+                + pass_clause + ')'
         sql = Entity.build_sql() + """
             {user_clause}
             WHERE (UNACCENT(LOWER(e.name)) LIKE UNACCENT(LOWER(%(term)s))
             {description_clause})
             {user_clause2}
-            AND e.system_class IN %(classes)s GROUP BY e.id ORDER BY e.name;""".format(
+            AND e.system_class IN %(classes)s {date_clause}
+            GROUP BY e.id ORDER BY e.name;""".format(
             user_clause="""
                 LEFT JOIN web.user_log ul ON e.id = ul.entity_id """ if own else '',
             description_clause="""
@@ -175,9 +239,24 @@ class Entity:
                 OR UNACCENT(lower(e.begin_comment)) LIKE UNACCENT(lower(%(term)s))
                 OR UNACCENT(lower(e.end_comment)) LIKE UNACCENT(lower(%(term)s))"""
             if desc else '',
-            user_clause2=' AND ul.user_id = %(user_id)s ' if own else '')
+            user_clause2=' AND ul.user_id = %(user_id)s ' if own else '',
+            date_clause=date_clause)
         g.cursor.execute(sql, {
             'term': '%' + term + '%',
             'user_id': user_id,
-            'classes': tuple(classes)})
+            'classes': tuple(classes),
+            'from_date': from_date,
+            'to_date': to_date})
         return [dict(row) for row in g.cursor.fetchall()]
+
+
+SQL_VARIANTS = {
+    (nodes, aliases): Entity.build_sql_variant(nodes, aliases)
+    for nodes in (False, True) for aliases in (False, True)}
+
+# Prepared once per pooled connection (see database.connect.open_connection)
+PREPARED_ENTITY = """
+    PREPARE openatlas_get_entity_by_id (int) AS """ + Entity.build_sql() + """
+        WHERE e.id = $1 GROUP BY e.id;
+    PREPARE openatlas_profile_image (int) AS
+        SELECT i.image_id FROM web.entity_profile_image i WHERE i.entity_id = $1;"""
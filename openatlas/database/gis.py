@@ -40,6 +40,32 @@ class Gis:
                 geometries.append(geometry)
         return geometries
 
+    @staticmethod
+    def get_by_ids(ids: List[int]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+        geometries = []
+        for shape in ['point', 'polygon', 'linestring']:
+            sql = """
+                SELECT
+                    {shape}.entity_id,
+                    {shape}.id,
+                    {shape}.name,
+                    {shape}.description,
+                    {shape}.type,
+                    public.ST_AsGeoJSON({shape}.geom) AS geojson
+                FROM gis.{shape} {shape}
+                WHERE {shape}.entity_id IN %(ids)s;""".format(shape=shape)
+            g.cursor.execute(sql, {'ids': tuple(ids)})
+            for row in g.cursor.fetchall():
+                geometry = ast.literal_eval(row['geojson'])
+                geometry['title'] = row['name'].replace('"', '\"') if row['name'] else ''
+                geometry['description'] = \
+                    row['description'].replace('"', '\"') if row['description'] else ''
+                geometry['entity_id'] = row['entity_id']
+                geometries.append(geometry)
+        return geometries
+
     @staticmethod
     def get_by_shape(shape: str, extra_ids: List[int]) -> List[Dict[str, Any]]:
         polygon_sql = '' if shape != 'polygon' else \
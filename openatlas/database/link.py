@@ -1,6 +1,38 @@
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from flask import g
+from psycopg2 import extras
+
+# The column list shared by every link SELECT
+LINK_COLUMNS = """
+        l.id, l.property_code, l.domain_id, l.range_id, l.description, l.created,
+        l.modified, l.type_id,
+        COALESCE(to_char(l.begin_from, 'yyyy-mm-dd BC'), '') AS begin_from, l.begin_comment,
+        COALESCE(to_char(l.begin_to, 'yyyy-mm-dd BC'), '') AS begin_to,
+        COALESCE(to_char(l.end_from, 'yyyy-mm-dd BC'), '') AS end_from, l.end_comment,
+        COALESCE(to_char(l.end_to, 'yyyy-mm-dd BC'), '') AS end_to"""
+
+# Getting links of an entity is by far the most frequent query, so these are
+# prepared once per pooled connection to skip parse and plan on every call
+PREPARED_GET_LINKS = """
+    PREPARE openatlas_get_links (int) AS
+        SELECT """ + LINK_COLUMNS + """, e.name
+        FROM model.link l
+        JOIN model.entity e ON l.range_id = e.id
+        WHERE l.domain_id = $1
+        GROUP BY l.id, e.name
+        ORDER BY e.name;
+    PREPARE openatlas_get_links_inverse (int) AS
+        SELECT """ + LINK_COLUMNS + """, e.name
+        FROM model.link l
+        JOIN model.entity e ON l.domain_id = e.id
+        WHERE l.range_id = $1
+        GROUP BY l.id, e.name
+        ORDER BY e.name;
+    PREPARE openatlas_get_link_by_id (int) AS
+        SELECT """ + LINK_COLUMNS + """
+        FROM model.link l
+        WHERE l.id = $1;"""
 
 
 class Link:
@@ -17,42 +49,60 @@ class Link:
         g.cursor.execute(sql, data)
 
     @staticmethod
-    def insert(data: Dict[str, Any]) -> int:
-        sql = """
+    def insert(rows: List[Tuple[Any, ...]]) -> List[int]:
+        # One INSERT for any number of links instead of a round trip per link
+        result = extras.execute_values(
+            g.cursor,
+            """
             INSERT INTO model.link (property_code, domain_id, range_id, description, type_id)
-            VALUES (%(property_code)s, %(domain_id)s, %(range_id)s, %(description)s, %(type_id)s)
-            RETURNING id;"""
-        g.cursor.execute(sql, data)
-        return g.cursor.fetchone()['id']
+            VALUES %s RETURNING id;""",
+            rows,
+            fetch=True)
+        return [row['id'] for row in result]
+
+    @staticmethod
+    def get_linked_entities(id_: int,
+                            codes: List[str],
+                            inverse: bool,
+                            limit: Optional[int] = None) -> List[int]:
+        # array_agg returns the ids as one row instead of a tuple per id
+        sql = """
+            SELECT array_agg(id) AS result_ids FROM (
+                SELECT {field} AS id FROM model.link
+                WHERE {filter_field} = %(id_)s AND property_code IN %(codes)s
+                {limit}) AS ids;""".format(
+            field='domain_id' if inverse else 'range_id',
+            filter_field='range_id' if inverse else 'domain_id',
+            limit='LIMIT %(limit)s' if limit else '')
+        g.cursor.execute(sql, {'id_': id_, 'codes': tuple(codes), 'limit': limit})
+        return g.cursor.fetchone()['result_ids'] or []
 
     @staticmethod
-    def get_linked_entities(id_: int, codes: List[str], inverse: bool) -> List[int]:
+    def get_linked_entities_inverse_by_ids(
+            ids: List[int],
+            codes: List[str]) -> List[Dict[str, Any]]:
         sql = """
-            SELECT range_id AS result_id FROM model.link
-            WHERE domain_id = %(id_)s AND property_code IN %(codes)s;"""
-        if inverse:
-            sql = """
-                SELECT domain_id AS result_id FROM model.link
-                WHERE range_id = %(id_)s AND property_code IN %(codes)s;"""
-        g.cursor.execute(sql, {'id_': id_, 'codes': tuple(codes)})
-        return [row['result_id'] for row in g.cursor.fetchall()]
+            SELECT domain_id, range_id FROM model.link
+            WHERE range_id IN %(ids)s AND property_code IN %(codes)s;"""
+        g.cursor.execute(sql, {'ids': tuple(ids), 'codes': tuple(codes)})
+        return [dict(row) for row in g.cursor.fetchall()]
 
     @staticmethod
     def get_links(entity_id: int,
                   codes: Union[str, List[str], None],
                   inverse: bool = False) -> List[Dict[str, Any]]:
-        sql = """
-            SELECT l.id, l.property_code, l.domain_id, l.range_id, l.description, l.created,
-                l.modified, e.name, l.type_id,
-                COALESCE(to_char(l.begin_from, 'yyyy-mm-dd BC'), '') AS begin_from, l.begin_comment,
-                COALESCE(to_char(l.begin_to, 'yyyy-mm-dd BC'), '') AS begin_to,
-                COALESCE(to_char(l.end_from, 'yyyy-mm-dd BC'), '') AS end_from, l.end_comment,
-                COALESCE(to_char(l.end_to, 'yyyy-mm-dd BC'), '') AS end_to
+        codes = [code for code in (codes if isinstance(codes, list) else [codes]) if code]
+        if not codes and getattr(g.db, 'prepared', False):  # Use the prepared statements
+            g.cursor.execute(
+                'EXECUTE openatlas_get_links{inverse}(%(entity_id)s)'.format(
+                    inverse='_inverse' if inverse else ''),
+                {'entity_id': entity_id})
+            return [dict(row) for row in g.cursor.fetchall()]
+        sql = 'SELECT ' + LINK_COLUMNS + """, e.name
             FROM model.link l
             JOIN model.entity e ON l.{second}_id = e.id """.format(
             second='domain' if inverse else 'range')
-        if codes:
-            codes = codes if isinstance(codes, list) else [codes]
+        if codes:  # Omit the filter entirely if all properties are wanted
             sql += ' AND l.property_code IN %(codes)s '
         sql += """
             WHERE l.{first}_id = %(entity_id)s
@@ -61,6 +111,26 @@ class Link:
         g.cursor.execute(sql, {'entity_id': entity_id, 'codes': tuple(codes) if codes else ''})
         return [dict(row) for row in g.cursor.fetchall()]
 
+    @staticmethod
+    def get_links_by_entities(entity_ids: List[int],
+                              codes: Union[str, List[str], None],
+                              inverse: bool = False) -> List[Dict[str, Any]]:
+        sql = 'SELECT ' + LINK_COLUMNS + """, e.name
+            FROM model.link l
+            JOIN model.entity e ON l.{second}_id = e.id """.format(
+            second='domain' if inverse else 'range')
+        codes = [code for code in (codes if isinstance(codes, list) else [codes]) if code]
+        if codes:  # Omit the filter entirely if all properties are wanted
+            sql += ' AND l.property_code IN %(codes)s '
+        sql += """
+            WHERE l.{first}_id IN %(entity_ids)s
+            GROUP BY l.id, e.name
+            ORDER BY e.name;""".format(first='range' if inverse else 'domain')
+        g.cursor.execute(sql, {
+            'entity_ids': tuple(entity_ids),
+            'codes': tuple(codes) if codes else ''})
+        return [dict(row) for row in g.cursor.fetchall()]
+
     @staticmethod
     def delete_by_codes(entity_id: int, codes: List[str], inverse: bool = False) -> None:
         sql = """
@@ -71,16 +141,12 @@ class Link:
 
     @staticmethod
     def get_by_id(id_: int) -> Dict[str, Any]:
-        sql = """
-            SELECT l.id, l.property_code, l.domain_id, l.range_id, l.description, l.created,
-                l.modified, l.type_id,
-                COALESCE(to_char(l.begin_from, 'yyyy-mm-dd BC'), '') AS begin_from, l.begin_comment,
-                COALESCE(to_char(l.begin_to, 'yyyy-mm-dd BC'), '') AS begin_to,
-                COALESCE(to_char(l.end_from, 'yyyy-mm-dd BC'), '') AS end_from, l.end_comment,
-                COALESCE(to_char(l.end_to, 'yyyy-mm-dd BC'), '') AS end_to
-            FROM model.link l
-            WHERE l.id = %(id)s;"""
-        g.cursor.execute(sql, {'id': id_})
+        if getattr(g.db, 'prepared', False):
+            g.cursor.execute('EXECUTE openatlas_get_link_by_id (%(id)s)', {'id': id_})
+        else:
+            g.cursor.execute(
+                'SELECT ' + LINK_COLUMNS + ' FROM model.link l WHERE l.id = %(id)s;',
+                {'id': id_})
         return dict(g.cursor.fetchone())
 
     @staticmethod
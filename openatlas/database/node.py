@@ -1,6 +1,8 @@
-from typing import Any, Dict, List, Union
+import uuid
+from typing import Any, Dict, Iterator, List, Union
 
 from flask import g
+from psycopg2 import extras
 
 
 class Node:
@@ -30,6 +32,50 @@ class Node:
         g.cursor.execute(sql, {'system_class': system_class, 'property_code': property_})
         return [dict(row) for row in g.cursor.fetchall()]
 
+    @staticmethod
+    def get_entities_of_nodes(node_ids: List[int]) -> List[Dict[str, Any]]:
+        sql = """
+            SELECT e.id, e.name FROM model.entity e
+            JOIN model.link l ON e.id = l.domain_id
+            WHERE l.range_id IN %(node_ids)s AND l.property_code IN ('P2', 'P89')
+            ORDER BY e.name;"""
+        g.cursor.execute(sql, {'node_ids': tuple(node_ids)})
+        return [dict(row) for row in g.cursor.fetchall()]
+
+    @staticmethod
+    def stream_entities_of_nodes(node_ids: List[int]) -> Iterator[List[Dict[str, Any]]]:
+        # A named (server side) cursor keeps memory bound to the batch size
+        # even for types with a huge number of entities.
+        # withhold because the pooled connection runs in autocommit mode and
+        # psycopg2 refuses named cursors outside transactions otherwise; the
+        # name is unique per call and the finally closes the portal even if a
+        # consumer abandons the generator, e.g. on client disconnect
+        cursor = g.db.cursor(
+            name='node_entities_stream_' + uuid.uuid4().hex,
+            cursor_factory=extras.DictCursor,
+            withhold=True)
+        try:
+            cursor.execute("""
+                SELECT e.id, e.name FROM model.entity e
+                JOIN model.link l ON e.id = l.domain_id
+                WHERE l.range_id IN %(node_ids)s AND l.property_code IN ('P2', 'P89')
+                ORDER BY e.name;""", {'node_ids': tuple(node_ids)})
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def count_entities_of_nodes(node_ids: List[int]) -> int:
+        sql = """
+            SELECT COUNT(*) AS count FROM model.link
+            WHERE range_id IN %(node_ids)s AND property_code IN ('P2', 'P89');"""
+        g.cursor.execute(sql, {'node_ids': tuple(node_ids)})
+        return g.cursor.fetchone()['count']
+
     @staticmethod
     def get_web_forms() -> List[Dict[str, Any]]:
         g.cursor.execute("SELECT id, name, extendable FROM web.form ORDER BY name ASC;")
@@ -1,4 +1,4 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from flask import session
 from flask_wtf import FlaskForm
@@ -31,6 +31,22 @@ class Content:
             return translations[session['language']]
         return translations[session['settings']['default_language']]
 
+    @staticmethod
+    def get_translations(names: List[str], lang: Optional[str] = None) -> Dict[str, str]:
+        """ Like get_translation for multiple names but with a single query."""
+        translations: Dict[str, Dict[str, str]] = {name: {} for name in names}
+        for row in Db.get_translations(names):
+            translations[row['name']][row['language']] = row['text']
+        result = {}
+        for name, items in translations.items():
+            if lang and items.get(lang):
+                result[name] = items[lang]  # pragma: no cover, can be used by API
+            elif items.get(session['language']):
+                result[name] = items[session['language']]
+            else:
+                result[name] = items.get(session['settings']['default_language'], '')
+        return result
+
     @staticmethod
     def update_content(name: str, form: FlaskForm) -> None:
         for language in app.config['LANGUAGES'].keys():
@@ -1,4 +1,5 @@
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
 import numpy
@@ -23,7 +24,10 @@ class Date:
             minute=str(today.minute).zfill(2))
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def timestamp_to_datetime64(string: str) -> Optional[numpy.datetime64]:
+        # Called four times per row in Entity.__init__ and timestamps repeat
+        # heavily, so results are cached (datetime64 values are immutable)
         if not string:
             return None
         if 'BC' in string:
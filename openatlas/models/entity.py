@@ -1,14 +1,14 @@
 from __future__ import annotations  # Needed for Python 4.0 type annotations
 
-import ast
-from typing import Any, Dict, Iterable, List, Optional, Set, TYPE_CHECKING, Union
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, TYPE_CHECKING, Union
 
 from flask import g, request
 from flask_wtf import FlaskForm
-from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz
 from werkzeug.exceptions import abort
 
-from openatlas import app
+from openatlas import app, bootstrap
 from openatlas.database.entity import Entity as Db
 from openatlas.forms.date import format_date
 from openatlas.models.date import Date
@@ -19,22 +19,32 @@ if TYPE_CHECKING:  # pragma: no cover - Type checking is disabled in tests
     from openatlas.models.node import Node
     from openatlas.models.reference_system import ReferenceSystem
 
+PAREN_TABLE = str.maketrans('', '', '()')  # Strips parentheses in one pass
+
 
 class Entity:
 
+    # No per instance __dict__ for the thousands of entities built in list
+    # views; subclasses like Node still get one for their extra attributes
+    __slots__ = (
+        'id', 'nodes', 'aliases', 'name', 'description', 'created', 'modified',
+        'cidoc_class', 'class_', 'reference_systems', 'origin_id', 'image_id',
+        'linked_places', 'location', 'info_data', 'begin_from', 'begin_to',
+        'begin_comment', 'end_from', 'end_to', 'end_comment', 'first', 'last')
+
     def __init__(self, data: Dict[str, Any]) -> None:
 
         self.id = data['id']
         self.nodes: Dict['Node', str] = {}
 
         if 'nodes' in data and data['nodes']:
+            nodes_ = g.nodes  # Bound once, flask.g dispatches through a proxy on every access
             for node in data['nodes']:
-                self.nodes[g.nodes[node['f1']]] = node['f2']  # f1 = node id, f2 = value
+                self.nodes[nodes_[node['f1']]] = node['f2']  # f1 = node id, f2 = value
         self.aliases: Dict[int, str] = {}
         if 'aliases' in data and data['aliases']:
-            for alias in data['aliases']:
+            for alias in data['aliases']:  # Sorted by name in SQL
                 self.aliases[alias['f1']] = alias['f2']  # f1 = alias id, f2 = alias name
-            self.aliases = {k: v for k, v in sorted(self.aliases.items(), key=lambda item: item[1])}
         self.name = data['name']
         self.description = data['description']
         self.created = data['created']
@@ -68,6 +78,11 @@ class Entity:
             self.last = format_date(self.end_from, 'year') if self.end_from else None
             self.last = format_date(self.end_to, 'year') if self.end_to else self.last
 
+        # Per request identity map so repeated get_by_id calls skip the SQL round trip
+        if not hasattr(g, 'entity_cache'):
+            g.entity_cache = {}
+        g.entity_cache[self.id] = self
+
     def get_linked_entity(self,
                           code: str,
                           inverse: bool = False,
@@ -101,8 +116,11 @@ class Entity:
                     inverse: bool = False) -> List[int]:
         # range_ = string value from a form, can be empty, an int or an int list presentation
         # e.g. '', '1', '[]', '[1, 2]'
-        ids = ast.literal_eval(range_)
-        ids = [int(id_) for id_ in ids] if isinstance(ids, list) else [int(ids)]
+        value = range_.strip()
+        if value.startswith('['):  # Split directly, much cheaper than ast.literal_eval
+            ids = [int(part) for part in value[1:-1].split(',') if part.strip()]
+        else:
+            ids = [int(value)] if value else []
         return Link.insert(self, code, Entity.get_by_ids(ids), description, inverse)
 
     def get_links(self, codes: Union[str, List[str]], inverse: bool = False) -> List[Link]:
@@ -125,9 +143,9 @@ class Entity:
                 if hasattr(form, field):
                     setattr(self, field, getattr(form, field).data)
             if hasattr(form, 'name_inverse'):  # A directional node, e.g. actor actor relation
-                self.name = form.name.data.replace('(', '').replace(')', '').strip()
+                self.name = form.name.data.translate(PAREN_TABLE).strip()
                 if form.name_inverse.data.strip():
-                    inverse = form.name_inverse.data.replace('(', '').replace(')', '').strip()
+                    inverse = form.name_inverse.data.translate(PAREN_TABLE).strip()
                     self.name += ' (' + inverse + ')'
         if self.class_.name == 'type':
             self.name = sanitize(self.name, 'node')
@@ -144,6 +162,8 @@ class Entity:
             'begin_comment': str(self.begin_comment).strip() if self.begin_comment else None,
             'end_comment': str(self.end_comment).strip() if self.end_comment else None,
             'description': sanitize(self.description, 'text')})
+        if self.class_.view in ['type', 'reference_system']:
+            bootstrap.invalidate()
 
     def update_aliases(self, form: FlaskForm) -> None:
         if not hasattr(form, 'alias'):
@@ -229,7 +249,11 @@ class Entity:
     def delete_(id_: Union[int, List[int]]) -> None:
         if not id_:
             return
-        Db.delete(id_ if isinstance(id_, list) else [id_])
+        ids = id_ if isinstance(id_, list) else [id_]
+        if hasattr(g, 'entity_cache'):  # Deleted entities must not be served from the cache
+            for entity_id in ids:
+                g.entity_cache.pop(entity_id, None)
+        Db.delete(ids)
 
     @staticmethod
     def get_by_class(classes: Union[str, List[str]],
@@ -261,6 +285,8 @@ class Entity:
             'code': g.classes[class_name].cidoc_class.code,
             'system_class': class_name,
             'description': sanitize(description, 'text') if description else None})
+        if g.classes[class_name].view in ['type', 'reference_system']:
+            bootstrap.invalidate()
         return Entity.get_by_id(id_)
 
     @staticmethod
@@ -271,6 +297,8 @@ class Entity:
             return g.nodes[id_]
         if id_ in g.reference_systems:
             return g.reference_systems[id_]
+        if not nodes and not aliases and hasattr(g, 'entity_cache') and id_ in g.entity_cache:
+            return g.entity_cache[id_]  # Only without nodes/aliases which may not be loaded
         data = Db.get_by_id(id_, nodes, aliases)
         if not data:
             if 'activity' in request.path:
@@ -279,8 +307,8 @@ class Entity:
         return Entity(data)
 
     @staticmethod
-    def get_by_ids(ids: Iterable[int], nodes: bool = False) -> List[Entity]:
-        return [Entity(row) for row in Db.get_by_ids(ids, nodes)]
+    def get_by_ids(ids: Iterable[int], nodes: bool = False, aliases: bool = False) -> List[Entity]:
+        return [Entity(row) for row in Db.get_by_ids(ids, nodes, aliases)]
 
     @staticmethod
     def get_by_project_id(project_id: int) -> List[Entity]:
@@ -297,29 +325,54 @@ class Entity:
 
     @staticmethod
     def get_similar_named(form: FlaskForm) -> Dict[int, Any]:
-        similar: Dict[int, Any] = {}
-        already_added: Set[int] = set()
         entities = Entity.get_by_class(form.classes.data)
-        for sample in entities:
-            if sample.id in already_added:
-                continue
-            similar[sample.id] = {'entity': sample, 'entities': []}
-            for entity in entities:
-                if sample.id == entity.id:
-                    continue
-                if fuzz.ratio(sample.name, entity.name) >= form.ratio.data:
-                    already_added.add(sample.id)
-                    already_added.add(entity.id)
-                    similar[sample.id]['entities'].append(entity)
-        return {similar: data for similar, data in similar.items() if data['entities']}
+        # Trigram blocking: only names sharing a character 3-gram get scored,
+        # names without any common trigram can't reach a high ratio anyway.
+        # This keeps the pair count near linear instead of quadratic.
+        buckets = defaultdict(list)
+        for index, entity in enumerate(entities):
+            name = entity.name.lower()
+            for gram in {name[i:i + 3] for i in range(len(name) - 2)} or {name}:
+                buckets[gram].append(index)
+        parent = list(range(len(entities)))
+
+        def find(index: int) -> int:
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        # Union find over the above cutoff pairs clusters connected components
+        # of similar names instead of first wins buckets
+        threshold = form.ratio.data
+        scored = set()  # Pairs sharing several trigrams are only scored once
+        for indexes in buckets.values():
+            for position, first in enumerate(indexes):
+                for second in indexes[position + 1:]:
+                    if (first, second) in scored:
+                        continue
+                    scored.add((first, second))
+                    if fuzz.ratio(
+                            entities[first].name,
+                            entities[second].name,
+                            score_cutoff=threshold):
+                        parent[find(second)] = find(first)
+        components = defaultdict(list)
+        for index, entity in enumerate(entities):
+            components[find(index)].append(entity)
+        return {
+            members[0].id: {'entity': members[0], 'entities': members[1:]}
+            for members in components.values() if len(members) > 1}
 
     @staticmethod
     def get_overview_counts() -> Dict[str, int]:
-        return Db.get_overview_counts(g.class_view_mapping.keys())
+        # Read from the process wide cache because the overview count API
+        # route skips loading the model metadata into g (see before_request)
+        return Db.get_overview_counts(bootstrap.load()['class_view_mapping'].keys())
 
     @staticmethod
     def get_orphans() -> List[Entity]:
-        return [Entity.get_by_id(row['id']) for row in Db.get_orphans()]
+        return [Entity(row) for row in Db.get_orphans()]
 
     @staticmethod
     def get_latest(limit: int) -> List[Entity]:
@@ -331,4 +384,4 @@ class Entity:
 
     @staticmethod
     def get_circular() -> List[Entity]:  # Get entities that are linked to itself.
-        return [Entity.get_by_id(row['domain_id']) for row in Db.get_circular()]
+        return Entity.get_by_ids([row['domain_id'] for row in Db.get_circular()])
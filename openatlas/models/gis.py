@@ -26,6 +26,14 @@ class Gis:
     def get_by_id(id_: int) -> List[Dict[str, Any]]:
         return Db.get_by_id(id_)
 
+    @staticmethod
+    def get_by_ids(ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """ Get geometries of multiple locations with one query, grouped by id."""
+        geometries: Dict[int, List[Dict[str, Any]]] = {id_: [] for id_ in ids}
+        for geometry in Db.get_by_ids(ids):
+            geometries[geometry.pop('entity_id')].append(geometry)
+        return geometries
+
     @staticmethod
     def get_all(objects: Optional[List[Entity]] = None,
                 structure: Optional[Dict[str, Any]] = None) -> Dict[str, List[Any]]:
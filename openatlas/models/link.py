@@ -16,7 +16,13 @@ if TYPE_CHECKING:  # pragma: no cover - Type checking is disabled in tests
 
 
 class Link:
-    object_: Optional['Entity']
+
+    # No per instance __dict__ because one Link is built per row on link
+    # heavy pages; object_ is set in views for first and last appearance info
+    __slots__ = (
+        'id', 'description', 'property', 'domain', 'range', 'type', 'nodes', 'object_',
+        'begin_from', 'begin_to', 'begin_comment', 'end_from', 'end_to', 'end_comment',
+        'first', 'last')
 
     def __init__(self,
                  row: Dict[str, Any],
@@ -45,6 +51,7 @@ class Link:
             self.last = format_date(self.end_to, 'year') if self.end_to else self.last
 
     def update(self) -> None:
+        Link.invalidate_cache()
         Db.update({
             'id': self.id,
             'property_code': self.property.code,
@@ -91,7 +98,7 @@ class Link:
                type_id: Optional[int] = None) -> List[int]:
         property_ = g.properties[property_code]
         entities = range_ if isinstance(range_, list) else [range_]
-        new_link_ids = []
+        rows = []
         for linked_entity in entities:
             domain = linked_entity if inverse else entity
             range_ = entity if inverse else linked_entity
@@ -107,21 +114,19 @@ class Link:
                 logger.log('error', 'model', text)
                 flash(text, 'error')
                 continue
-            id_ = Db.insert({
-                'property_code': property_code,
-                'domain_id': domain.id,
-                'range_id': range_.id,
-                'description': description,
-                'type_id': type_id})
-            new_link_ids.append(id_)
-        return new_link_ids
+            rows.append((property_code, domain.id, range_.id, description, type_id))
+        if not rows:
+            return []
+        Link.invalidate_cache()
+        return Db.insert(rows)  # One INSERT for all links
 
     @staticmethod
     def get_linked_entity(id_: int,
                           code: str,
                           inverse: bool = False,
                           nodes: bool = False) -> 'Entity':
-        result = Link.get_linked_entities(id_, [code], inverse=inverse, nodes=nodes)
+        # Two rows are enough to both return the entity and detect duplicates
+        result = Link.get_linked_entities(id_, [code], inverse=inverse, nodes=nodes, limit=2)
         if len(result) > 1:  # pragma: no cover
             logger.log('error', 'model', 'Multiple linked entities found for ' + code)
             flash(_('error multiple linked entities found'), 'error')
@@ -132,13 +137,26 @@ class Link:
     def get_linked_entities(id_: int,
                             codes: Union[str, List[str]],
                             inverse: bool = False,
-                            nodes: bool = False) -> List['Entity']:
+                            nodes: bool = False,
+                            limit: Optional[int] = None) -> List['Entity']:
         from openatlas.models.entity import Entity
         codes = codes if isinstance(codes, list) else [codes]
         return Entity.get_by_ids(
-            Db.get_linked_entities(id_, codes, inverse),
+            Db.get_linked_entities(id_, codes, inverse, limit),
             nodes=nodes)
 
+    @staticmethod
+    def get_linked_entities_inverse_by_ids(
+            ids: List[int],
+            codes: List[str]) -> Dict[int, 'Entity']:
+        """ Map each range id to its linking domain entity with a single query."""
+        from openatlas.models.entity import Entity
+        rows = Db.get_linked_entities_inverse_by_ids(ids, codes)
+        entities = {
+            entity.id: entity
+            for entity in Entity.get_by_ids({row['domain_id'] for row in rows})}
+        return {row['range_id']: entities[row['domain_id']] for row in rows}
+
     @staticmethod
     def get_linked_entity_safe(id_: int, code: str,
                                inverse: bool = False,
@@ -155,6 +173,13 @@ class Link:
                   codes: Union[str, List[str], None] = None,
                   inverse: bool = False) -> List[Link]:
         from openatlas.models.entity import Entity
+        # Views and filters often fetch the same links several times while
+        # rendering one page, so results are memoized per request
+        key = (entity_id, tuple(codes) if isinstance(codes, list) else codes, inverse)
+        if not hasattr(g, 'link_cache'):
+            g.link_cache = {}
+        if key in g.link_cache:
+            return g.link_cache[key]
         entity_ids = set()
         result = Db.get_links(entity_id, codes if isinstance(codes, list) else [codes], inverse)
         for row in result:
@@ -167,10 +192,42 @@ class Link:
                 row,
                 domain=entities[row['domain_id']],
                 range_=entities[row['range_id']]))
+        g.link_cache[key] = links
+        return links
+
+    @staticmethod
+    def invalidate_cache() -> None:
+        """ Drop the per request link memoization after any link write."""
+        g.pop('link_cache', None)
+
+    @staticmethod
+    def get_links_bulk(entity_ids: List[int],
+                       codes: Union[str, List[str], None] = None,
+                       inverse: bool = False) -> Dict[int, List[Link]]:
+        """ Get links of multiple entities with one query, grouped by entity id."""
+        from openatlas.models.entity import Entity
+        links: Dict[int, List[Link]] = {id_: [] for id_ in entity_ids}
+        if not entity_ids:
+            return links
+        result = Db.get_links_by_entities(
+            entity_ids,
+            codes if isinstance(codes, list) else [codes],
+            inverse)
+        linked_ids = set()
+        for row in result:
+            linked_ids.add(row['domain_id'])
+            linked_ids.add(row['range_id'])
+        entities = {entity.id: entity for entity in Entity.get_by_ids(linked_ids, nodes=True)}
+        for row in result:
+            links[row['range_id'] if inverse else row['domain_id']].append(Link(
+                row,
+                domain=entities[row['domain_id']],
+                range_=entities[row['range_id']]))
         return links
 
     @staticmethod
     def delete_by_codes(entity: 'Entity', codes: List[str], inverse: bool = False) -> None:
+        Link.invalidate_cache()
         Db.delete_by_codes(entity.id, codes, inverse)
 
     @staticmethod
@@ -183,6 +240,7 @@ class Link:
 
     @staticmethod
     def delete_(id_: int) -> None:
+        Link.invalidate_cache()
         Db.delete_(id_)
 
     @staticmethod
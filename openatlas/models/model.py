@@ -1,6 +1,6 @@
 from __future__ import annotations  # Needed for Python 4.0 type annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 from flask import g, session
 
@@ -20,6 +20,7 @@ class CidocClass:
         self.i18n: Dict[str, str] = {}
         self.sub: List[CidocClass] = []
         self.super: List[CidocClass] = []
+        self.crm_class = ''  # Set in get_all() after translations are loaded
 
     @property
     def name(self) -> str:
@@ -42,6 +43,10 @@ class CidocClass:
             classes[row['sub_code']].super.append(row['super_code'])
         for row in Db.get_class_translations(app.config['LANGUAGES'].keys()):
             classes[row['class_code']].i18n[row['language_code']] = row['text']
+        for class_ in classes.values():  # Pre-build the API class string, e.g. "crm:E21_Person"
+            class_.crm_class = 'crm:{code}_{name}'.format(
+                code=class_.code,
+                name=class_.i18n.get('en', class_._name).replace(' ', '_'))
         return classes
 
 
@@ -60,6 +65,9 @@ class CidocProperty:
         self.super: List[int] = []
         self.i18n: Dict[str, str] = {}
         self.i18n_inverse: Dict[str, str] = {}
+        self.relation_type = ''  # Set in get_all() after translations are loaded
+        self.relation_type_inverse = ''
+        self.valid_codes: Dict[Tuple[str, int], bool] = {}  # find_object results
 
     @property
     def name(self) -> str:
@@ -82,10 +90,14 @@ class CidocProperty:
         return getattr(self, '_name_inverse')  # pragma: no cover
 
     def find_object(self, attr: str, class_id: int) -> bool:  # Check if links are CIDOC CRM valid
-        valid_domain_id = getattr(self, attr)
-        if valid_domain_id == class_id:
-            return True
-        return self.find_subs(attr, class_id, g.cidoc_classes[valid_domain_id].sub)
+        # The recursive sub class walk is cached, the CIDOC hierarchy is static
+        # and instances are rebuilt with the model metadata anyway
+        key = (attr, class_id)
+        if key not in self.valid_codes:
+            valid_domain_id = getattr(self, attr)
+            self.valid_codes[key] = valid_domain_id == class_id or self.find_subs(
+                attr, class_id, g.cidoc_classes[valid_domain_id].sub)
+        return self.valid_codes[key]
 
     def find_subs(self, attr: str, class_id: int, valid_subs: List[int]) -> bool:
         for sub_id in valid_subs:
@@ -105,4 +117,13 @@ class CidocProperty:
             properties[row['property_code']].i18n[row['language_code']] = row['text']
             properties[row['property_code']].i18n_inverse[
                 row['language_code']] = row['text_inverse']
+        for property_ in properties.values():  # Pre-build API strings, e.g. "crm:P2_has_type"
+            name = property_.i18n.get('en', property_._name)
+            name_inverse = property_.i18n_inverse.get('en') or name
+            property_.relation_type = 'crm:{code}_{name}'.format(
+                code=property_.code,
+                name=name.replace(' ', '_'))
+            property_.relation_type_inverse = 'crm:{code}i_{name}'.format(
+                code=property_.code,
+                name=name_inverse.replace(' ', '_'))
         return properties
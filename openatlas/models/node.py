@@ -1,13 +1,13 @@
 from __future__ import annotations  # Needed for Python 4.0 type annotations
 
 import ast
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from flask import g
 from flask_babel import lazy_gettext as _
 from flask_wtf import FlaskForm
 
-from openatlas import app
+from openatlas import app, bootstrap
 from openatlas.models.entity import Entity
 from openatlas.util.display import uc_first
 from openatlas.database.node import Node as Db
@@ -100,13 +100,21 @@ class Node(Entity):
 
     @staticmethod
     def get_tree_data(node_id: int, selected_ids: List[int]) -> List[Dict[str, Any]]:
-        return Node.walk_tree(g.nodes[node_id].subs, selected_ids)
+        # Cached per request because forms often render the same tree for
+        # multiple fields
+        if not hasattr(g, 'tree_data_cache'):
+            g.tree_data_cache = {}
+        key = (node_id, tuple(sorted(selected_ids)))
+        if key not in g.tree_data_cache:
+            g.tree_data_cache[key] = Node.walk_tree(g.nodes[node_id].subs, selected_ids)
+        return g.tree_data_cache[key]
 
     @staticmethod
     def walk_tree(nodes: List[Node], selected_ids: List[int]) -> List[Dict[str, Any]]:
         items = []
+        nodes_ = g.nodes  # Bound once, flask.g dispatches through a proxy on every access
         for id_ in nodes:
-            item = g.nodes[id_]
+            item = nodes_[id_]
             items.append({
                 'id': item.id,
                 'text': item.name.replace("'", "&apos;"),
@@ -114,6 +122,20 @@ class Node(Entity):
                 'children': Node.walk_tree(item.subs, selected_ids)})
         return items
 
+    @staticmethod
+    def get_entities_of_nodes(node_ids: List[int]) -> List[Dict[str, Any]]:
+        """ Get id and name of entities linked to nodes without hydrating them."""
+        return Db.get_entities_of_nodes(node_ids)
+
+    @staticmethod
+    def stream_entities_of_nodes(node_ids: List[int]) -> Iterator[List[Dict[str, Any]]]:
+        """ Like get_entities_of_nodes but in batches from a server side cursor."""
+        return Db.stream_entities_of_nodes(node_ids)
+
+    @staticmethod
+    def count_entities_of_nodes(node_ids: List[int]) -> int:
+        return Db.count_entities_of_nodes(node_ids)
+
     @staticmethod
     def get_nodes_for_form(form_name: str) -> Dict[int, Node]:
         return {id_: g.nodes[id_] for id_ in Db.get_nodes_for_form(form_name)}
@@ -149,6 +171,7 @@ class Node(Entity):
                         entity.link('P89', range_)
                 elif entity.class_.name != 'object_location' and not isinstance(entity, Node):
                     entity.link('P2', range_)
+        bootstrap.invalidate()  # Node counts have changed
 
     @staticmethod
     def insert_hierarchy(node: Node, form: FlaskForm, value_type: bool) -> None:
@@ -161,6 +184,7 @@ class Node(Entity):
             'multiple': multiple,
             'value_type': value_type})
         Node.add_forms_to_hierarchy(node, form)
+        bootstrap.invalidate()
 
     @staticmethod
     def update_hierarchy(node: Node, form: FlaskForm) -> None:
@@ -169,6 +193,7 @@ class Node(Entity):
             multiple = True
         Db.update_hierarchy({'id': node.id, 'name': form.name.data, 'multiple': multiple})
         Node.add_forms_to_hierarchy(node, form)
+        bootstrap.invalidate()
 
     @staticmethod
     def add_forms_to_hierarchy(node: Node, form: FlaskForm) -> None:
@@ -209,6 +234,7 @@ class Node(Entity):
                 Db.remove_link_type(old_node.id, delete_ids)
             else:
                 Db.remove_entity_type(old_node.id, delete_ids)
+        bootstrap.invalidate()
 
     @staticmethod
     def get_all_sub_ids(node: Node, subs: Optional[List[int]] = None) -> List[int]:
@@ -230,6 +256,7 @@ class Node(Entity):
     @staticmethod
     def remove_form_from_hierarchy(form_id: int, hierarchy_id: int) -> None:
         Db.remove_form_from_hierarchy(form_id, hierarchy_id)
+        bootstrap.invalidate()
 
     @staticmethod
     def remove_by_entity_and_node(entity_id: int, node_id: int) -> None:
@@ -5,7 +5,7 @@ from typing import Any, Dict, List, Tuple, Union
 from flask import g
 from flask_wtf import FlaskForm
 
-from openatlas import app
+from openatlas import app, bootstrap
 from openatlas.database.reference_system import ReferenceSystem as Db
 from openatlas.models.entity import Entity
 
@@ -39,6 +39,7 @@ class ReferenceSystem(Entity):
 
     def add_forms(self, form: FlaskForm) -> None:
         Db.add_forms(self.id, form.forms.data)
+        bootstrap.invalidate()
 
     def remove_form(self, form_id: int) -> None:
         forms = self.get_forms()
@@ -46,6 +47,7 @@ class ReferenceSystem(Entity):
             if link_.range.class_.name == forms[form_id]['name']:  # pragma: no cover
                 return  # Abort if there are linked entities
         Db.remove_form(self.id, form_id)
+        bootstrap.invalidate()
 
     def get_forms(self) -> Dict[int, Dict[str, Any]]:
         return {row['id']: {'name': row['name']} for row in Db.get_forms(self.id)}
@@ -73,6 +75,7 @@ class ReferenceSystem(Entity):
                 Db.remove_link(system.id, entity.id)
                 if field.data:
                     system.link('P67', entity, field.data, type_id=precision_field.data)
+        bootstrap.invalidate()  # Reference system counts have changed
 
     @staticmethod
     def get_form_choices(entity: Union[ReferenceSystem, None]) -> List[Tuple[int, str]]:
@@ -49,21 +49,29 @@ def search(form: FlaskForm) -> ValuesView[Entity]:
         form.end_month.data = int(parts[1])
         form.end_day.data = int(parts[2])
 
-    # Get search results
+    # Get search results, the date criteria are applied in SQL
     entities = []
-    for row in Db.search(
-            form.term.data,
-            tuple(form.classes.data),
-            form.desc.data,
-            form.own.data,
-            current_user.id):
-        if row['system_class'] == 'actor_appellation':  # If found in actor alias
-            entity = Link.get_linked_entity(row['id'], 'P131', True)
-        elif row['system_class'] == 'appellation':  # If found in place alias
-            entity = Link.get_linked_entity(row['id'], 'P1', True)
-        else:
-            entity = Entity(row)
+    rows = Db.search(
+        form.term.data,
+        tuple(form.classes.data),
+        form.desc.data,
+        form.own.data,
+        current_user.id,
+        from_date=Date.datetime64_to_timestamp(from_date),
+        to_date=Date.datetime64_to_timestamp(to_date),
+        include_dateless=form.include_dateless.data)
+    # Resolve all alias hits to their actors and places with one batch query
+    alias_ids = [
+        row['id'] for row in rows
+        if row['system_class'] in ('actor_appellation', 'appellation')]
+    linked = Link.get_linked_entities_inverse_by_ids(alias_ids, ['P131', 'P1']) \
+        if alias_ids else {}
+    for row in rows:
+        if row['system_class'] not in ('actor_appellation', 'appellation'):
+            entities.append(Entity(row))
+            continue
 
+        entity = linked.get(row['id'])  # Found in alias
         if not entity:  # pragma: no cover
             continue
 
@@ -71,14 +79,13 @@ def search(form: FlaskForm) -> ValuesView[Entity]:
             entities.append(entity)
             continue
 
-        # Date criteria present but entity has no dates
+        # SQL only saw the alias row, so check the dates of the linked entity here
         if not entity.begin_from and not entity.begin_to and not entity.end_from \
                 and not entity.end_to:
             if form.include_dateless.data:  # Include dateless entities
                 entities.append(entity)
             continue
 
-        # Check date criteria
         dates = [entity.begin_from, entity.begin_to, entity.end_from, entity.end_to]
         begin_check_ok = False
         if not from_date:
@@ -1,6 +1,6 @@
 from typing import Any, Dict, List, Optional, Union
 
-from openatlas import app
+from openatlas import app, bootstrap
 from openatlas.database.settings import Settings as Db
 
 
@@ -35,7 +35,9 @@ class Settings:
             if field.type == 'BooleanField':
                 value = 'True' if field.data else ''
             Db.update(field.name, value)
+        bootstrap.invalidate()
 
     @staticmethod
     def set_logo(file_id: Optional[int] = None) -> None:
         Db.set_logo(file_id if file_id else '')
+        bootstrap.invalidate()
@@ -236,6 +236,18 @@ function clearSelect(name) {
   $('#' + name + '-clear').hide();
 }
 
+function initTable(name) {
+  // The config is read from an inline JSON block, so the wiring below is
+  // parsed once from this file instead of once per rendered table
+  const config = JSON.parse(document.getElementById(name + '_cfg').textContent);
+  $(document).ready(function () {
+    $('#' + name + '_table').DataTable(config);
+    overflow();
+    $('#' + name + '_table').on('page.dt', () => overflow());
+    $('#' + name + '_table').on('search.dt', () => overflow());
+  });
+}
+
 function overflow() {
   setTimeout(() => {
     $('td').bind('mouseenter', function () {
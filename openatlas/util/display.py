@@ -538,16 +538,21 @@ class MLStripper(HTMLParser):
         return ''.join(self.fed)
 
 
+# Compiled once instead of a cache lookup on every sanitize() call
+sanitize_node_re = re.compile(r'([^\s\w()]|_)+')
+sanitize_ascii_re = re.compile('[^A-Za-z0-9]+')
+
+
 def sanitize(string: Optional[str], mode: Optional[str] = None) -> str:
     if not string:
         return ''
     if mode == 'node':  # Only keep letters, numbers and spaces
-        return re.sub(r'([^\s\w()]|_)+', '', string).strip()
+        return sanitize_node_re.sub('', string).strip()
     if mode == 'text':  # Remove HTML tags, keep linebreaks
         s = MLStripper()
         s.feed(string)
         return s.get_data().strip()
-    return re.sub('[^A-Za-z0-9]+', '', string)  # Only keep ASCII letters and numbers
+    return sanitize_ascii_re.sub('', string)  # Only keep ASCII letters and numbers
 
 
 def format_datetime(value: Any) -> str:
@@ -1,5 +1,7 @@
+import bisect
 import pathlib
 import re
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Union
 
 import flask
@@ -12,7 +14,7 @@ from markupsafe import Markup
 from wtforms import Field, IntegerField
 from wtforms.validators import Email
 
-from openatlas import app
+from openatlas import app, get_locale
 from openatlas.models.content import Content
 from openatlas.models.entity import Entity
 from openatlas.models.imports import Project
@@ -26,6 +28,24 @@ blueprint: flask.Blueprint = flask.Blueprint('filters', __name__)
 paragraph_re = re.compile(r'(?:\r\n|\r|\n){2,}')
 
 
+MANUAL_ROOT = pathlib.Path(app.root_path) / 'static' / 'manual'
+
+
+@lru_cache(maxsize=512)
+def manual_page_exists(first: str, second: str) -> bool:
+    # The manual pages are static per deploy, so the stat syscall per
+    # rendered form row is only paid once per page
+    return (MANUAL_ROOT / first / second).exists()
+
+
+@lru_cache(maxsize=2048)
+def _uc(msgid: str, locale: str) -> str:
+    # Fixed menu and heading labels are rendered on every page, so the gettext
+    # lookup and capitalization are cached. The locale is part of the key only
+    # so each language gets its own entry.
+    return display.uc_first(str(_(msgid)))
+
+
 @jinja2.contextfilter
 @blueprint.app_template_filter()
 def link(self: Any, entity: Entity) -> str:
@@ -50,7 +70,7 @@ def display_citation_example(self: Any, code: str) -> str:
     if not text or code != 'reference':
         return ''
     return Markup('<h1>{title}</h1>{text}'.format(
-        title=display.uc_first(_('citation_example')),
+        title=_uc('citation_example', get_locale()),
         text=text))
 
 
@@ -59,21 +79,20 @@ def display_citation_example(self: Any, code: str) -> str:
 def siblings_pager(self: Any, entity: Entity, structure: Optional[Dict[str, Any]]) -> str:
     if not structure or len(structure['siblings']) < 2:
         return ''
-    structure['siblings'].sort(key=lambda x: x.id)
-    prev_id = None
-    next_id = None
-    position = None
-    for counter, sibling in enumerate(structure['siblings']):
-        position = counter + 1
-        prev_id = sibling.id if sibling.id < entity.id else prev_id
-        if sibling.id > entity.id:
-            next_id = sibling.id
-            position = counter
-            break
+    # The sorted id list is kept on the structure so repeated renders with the
+    # same structure find prev and next with a binary search instead of
+    # sorting and scanning every time
+    ids = structure.get('sorted_sibling_ids')
+    if not ids:
+        ids = sorted(sibling.id for sibling in structure['siblings'])
+        structure['sorted_sibling_ids'] = ids
+    position = bisect.bisect_left(ids, entity.id)
+    prev_id = ids[position - 1] if position > 0 else None
+    next_id = ids[position + 1] if position + 1 < len(ids) else None
     return Markup('{previous} {next} {position} {of_label} {count}'.format(
         previous=display.button('<', url_for('entity_view', id_=prev_id)) if prev_id else '',
         next=display.button('>', url_for('entity_view', id_=next_id)) if next_id else '',
-        position=position,
+        position=position + 1,
         of_label=_('of'),
         count=len(structure['siblings'])))
 
@@ -85,7 +104,7 @@ def breadcrumb(self: Any, crumbs: List[Any]) -> str:
     for item in crumbs:
         if not item:
             continue  # Item can be None e.g. if a dynamic generated URL has no origin parameter
-        elif isinstance(item, Entity) or isinstance(item, Project) or isinstance(item, User):
+        elif isinstance(item, (Entity, Project, User)):  # One check instead of a chain
             items.append(display.link(item))
         elif isinstance(item, list):
             items.append('<a href="{url}">{label}</a>'.format(
@@ -120,17 +139,18 @@ def uc_first(self: Any, string: str) -> str:
 @jinja2.contextfilter
 @blueprint.app_template_filter()
 def display_info(self: Any, data: Dict[str, Union[str, List[str]]]) -> str:
-    html = '<div class="data-table">'
+    parts = ['<div class="data-table">']  # Collect and join to avoid quadratic concatenation
     for label, value in data.items():
         if value or value == 0:
             if isinstance(value, list):
                 value = '<br>'.join(value)
-            html += '''
+            parts.append('''
                 <div class="table-row">
                     <div>{label}</div>
                     <div class="table-cell">{value}</div>
-                </div>'''.format(label=display.uc_first(label), value=value)
-    return Markup(html + '</div>')
+                </div>'''.format(label=display.uc_first(label), value=value))
+    parts.append('</div>')
+    return Markup(''.join(parts))
 
 
 @jinja2.contextfilter
@@ -174,22 +194,12 @@ def table_select_model(self: Any,
         {'orderDataType': 'cidoc-model', 'targets': [0]},
         {'sType': 'numeric', 'targets': [0]}])
 
-    for id_ in entities:
+    for id_, entity in entities.items():
+        value = entity.code + ' ' + entity.name  # Computed once, used in both cells
+        onclick = f"selectFromTable(this, '{name}', '{id_}', '{value}')"
         table.rows.append([
-            """<a
-                    onclick="selectFromTable(this, '{name}', '{entity_id}', '{value}')"
-                    href="#">{label}</a>""".format(
-                name=name,
-                entity_id=id_,
-                value=entities[id_].code + ' ' + entities[id_].name,
-                label=entities[id_].code),
-            """<a
-                    onclick="selectFromTable(this, '{name}', '{entity_id}', '{value}')"
-                    href="#">{label}</a>""".format(
-                name=name,
-                entity_id=id_,
-                value=entities[id_].code + ' ' + entities[id_].name,
-                label=entities[id_].name)])
+            f'<a onclick="{onclick}" href="#">{entity.code}</a>',
+            f'<a onclick="{onclick}" href="#">{entity.name}</a>'])
     value = selected.code + ' ' + selected.name if selected else ''
     html = """
         <input id="{name}-button" name="{name}-button" class="table-select" type="text"
@@ -289,8 +299,7 @@ def manual(self: Any, site: str) -> str:  # Creates a link to a manual page
         parts = site.split('/')
         first = parts[0]
         second = (parts[1] if parts[1] != 'node' else 'type') + '.html'
-        path = pathlib.Path(app.root_path) / 'static' / 'manual' / first / second
-        if not path.exists():
+        if not manual_page_exists(first, second):
             # print('Missing manual link: ' + str(path))
             return ''
     except:  # pragma: no cover
@@ -337,12 +346,19 @@ def display_form(self: Any,
     from openatlas.forms.field import ValueFloatField
 
     def display_value_type_fields(node_: Node, root: Optional[Node] = None) -> str:
+        # Rendered subtrees are memoized per request because value type
+        # hierarchies can be deep and the same form may render more than once
+        if not hasattr(g, 'value_type_html_cache'):
+            g.value_type_html_cache = {}
+        key = (node_.id, id(form))
+        if key in g.value_type_html_cache:
+            return g.value_type_html_cache[key]
         root = root if root else node_
-        html_ = ''
+        parts_ = []
         for sub_id in node_.subs:
             sub = g.nodes[sub_id]
             field_ = getattr(form, str(sub_id))
-            html_ += """
+            parts_.append("""
                 <div class="table-row value-type-switch{id}">
                     <div>{label}</div>
                     <div class="table-cell">{field} {unit}</div>
@@ -352,24 +368,26 @@ def display_form(self: Any,
                 label=sub.name,
                 unit=sub.description,
                 field=field_(class_='value-type'),
-                value_fields=display_value_type_fields(sub, root))
-        return html_
+                value_fields=display_value_type_fields(sub, root)))
+        g.value_type_html_cache[key] = ''.join(parts_)
+        return g.value_type_html_cache[key]
 
-    html = ''
+    parts = []  # Collect and join to avoid quadratic concatenation on large forms
     for field in form:
-        if isinstance(field, ValueFloatField) or field.id.startswith(
+        fid = field.id  # Checked several times below
+        if isinstance(field, ValueFloatField) or fid.startswith(
                 ('insert_', 'reference_system_precision')):
             continue  # These fields will be added in combination with other fields
         if field.type in ['CSRFTokenField', 'HiddenField']:
-            html += str(field)
+            parts.append(str(field))
             continue
-        if field.id.split('_', 1)[0] in ('begin', 'end'):  # If it's a date field use a function
-            if field.id == 'begin_year_from':
-                html += display.add_dates_to_form(form, for_persons)
+        if fid.startswith(('begin_', 'end_')):  # If it's a date field use a function
+            if fid == 'begin_year_from':
+                parts.append(display.add_dates_to_form(form, for_persons))
             continue
 
         if field.type in ['TreeField', 'TreeMultiField']:
-            hierarchy_id = int(field.id)
+            hierarchy_id = int(fid)
             node = g.nodes[hierarchy_id]
             label = node.name
             if node.standard and node.class_.name == 'type':
@@ -379,17 +397,17 @@ def display_form(self: Any,
             if node.value_type and 'is_node_form' not in form:
                 field.description = node.description
                 onclick = 'switch_value_type({id})'.format(id=node.id)
-                html += add_row(
+                parts.append(add_row(
                     field,
                     label,
-                    display.button(_('show'), onclick=onclick, css='secondary'))
-                html += display_value_type_fields(node)
+                    display.button(_('show'), onclick=onclick, css='secondary')))
+                parts.append(display_value_type_fields(node))
                 continue
             tooltip = '' if 'is_node_form' in form else ' ' + display.tooltip(node.description)
-            html += add_row(field, label + tooltip)
+            parts.append(add_row(field, label + tooltip))
             continue
 
-        if field.id == 'save':
+        if fid == 'save':
             field.label.text = display.uc_first(field.label.text)
             class_ = app.config['CSS']['button']['primary']
             buttons = []
@@ -403,26 +421,26 @@ def display_form(self: Any,
             if 'insert_continue_human_remains' in form:
                 buttons.append(form.insert_continue_human_remains(class_=class_))
             text = '<div class ="toolbar">{buttons}</div>'.format(buttons=' '.join(buttons))
-            html += add_row(field, '', text)
+            parts.append(add_row(field, '', text))
             continue
 
         # External reference system
-        if field.id.startswith('reference_system_id_'):
-            precision_field = getattr(form, field.id.replace('id_', 'precision_'))
+        if fid.startswith('reference_system_id_'):
+            precision_field = getattr(form, fid.replace('id_', 'precision_'))
             class_ = field.label.text if field.label.text in ['GeoNames', 'Wikidata'] else ''
-            html += add_row(field, field.label, ' '.join([
+            parts.append(add_row(field, field.label, ' '.join([
                 str(field(class_=class_)),
                 str(precision_field.label),
-                str(precision_field)]))
+                str(precision_field)])))
             continue
-        html += add_row(field, form_id=form_id)
+        parts.append(add_row(field, form_id=form_id))
 
     return Markup("""
         <form method="post" {id} {multi}>
             <div class="data-table">{html}</div>
         </form>""".format(
         id=('id="' + form_id + '" ') if form_id else '',
-        html=html,
+        html=''.join(parts),
         multi='enctype="multipart/form-data"' if hasattr(form, 'file') else ''))
 
 
@@ -463,7 +481,7 @@ def display_menu(self: Any, entity: Optional[Entity], origin: Optional[Entity])
         html += '<a href="/index/{item}" class="nav-item nav-link {css}">{label}</a>'.format(
             css=css,
             item=item,
-            label=display.uc_first(_(item)))
+            label=_uc(item, get_locale()))
     css = ''
     if request.path.startswith('/types') or request.path.startswith('/insert/type') or (
             entity and entity.class_.view == 'type'):
@@ -471,7 +489,7 @@ def display_menu(self: Any, entity: Optional[Entity], origin: Optional[Entity])
     html += '<a href="{url}" class="nav-item nav-link {css}">{label}</a>'.format(
         css=css,
         url=url_for('node_index'),
-        label=display.uc_first(_('types')))
+        label=_uc('types', get_locale()))
     return html
 
 
@@ -494,4 +512,5 @@ def display_external_references(self: Any, entity: Entity) -> str:
     html = '<br>'.join(system_links)
     if not html:
         return ''
-    return Markup('<h2>' + display.uc_first(_('external reference systems')) + '</h2>' + html)
+    return Markup(
+        '<h2>' + _uc('external reference systems', get_locale()) + '</h2>' + html)
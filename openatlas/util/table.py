@@ -1,11 +1,55 @@
-from typing import Any, Dict, List, Optional, Union
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from flask import json
-from flask_babel import lazy_gettext as _
+from flask_babel import get_locale, lazy_gettext as _
 from flask_login import current_user
 from markupsafe import Markup
 
 
+RIGHT_ALIGN = frozenset(('begin', 'end', 'size'))
+
+
+@lru_cache(maxsize=512)
+def right_align_defs(header: Tuple[str, ...]) -> Union[List[Dict[str, Any]], str]:
+    # Headers repeat across the many tables built per page, so the scan for
+    # right aligned columns runs once per distinct header
+    targets = [index for index, item in enumerate(header) if item in RIGHT_ALIGN]
+    return [{'className': 'dt-body-right', 'targets': targets}] if targets else ''
+
+
+EMPTY_COLUMN = {'title': ''}  # Shared padding dict, only read by the encoder
+
+
+@lru_cache(maxsize=512)
+def translated_columns(
+        header: Tuple[str, ...],
+        column_count: int,
+        locale: str) -> Tuple[Dict[str, str], ...]:
+    # Header labels repeat across tables and renders, so the gettext lookups
+    # are cached per locale; a tuple is returned so entries can't be mutated.
+    # Columns beyond the header labels are padded with empty titles.
+    columns = tuple({'title': str(_(item)).capitalize() if item else ''} for item in header)
+    return columns + (EMPTY_COLUMN,) * max(0, column_count - len(header))
+
+try:
+    import orjson
+
+    def dumps(data: Any) -> str:
+        # The C encoder handles str subclasses like Markup natively, lazy
+        # strings and form fields fall back to their string rendering
+        return orjson.dumps(data, default=str).decode()
+except ImportError:  # pragma: no cover
+    # One encoder instance skips the per call setup of json.dumps, compact
+    # separators keep the inline script payload small
+    ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str)
+
+    def dumps(data: Any) -> str:
+        # iterencode keeps peak memory lower than encode for tables with
+        # thousands of rows by joining bounded chunks
+        return ''.join(ENCODER.iterencode(data))
+
+
 class Table:
 
     def __init__(self,
@@ -20,45 +64,35 @@ class Table:
         self.order = order if order else ''
         self.defs = defs if defs else ''
         if not self.defs:
-            right_align = ['begin', 'end', 'size']
-            targets = [index for index, item in enumerate(self.header) if item in right_align]
-            self.defs = [{'className': 'dt-body-right', 'targets': targets}] if targets else ''
+            self.defs = right_align_defs(tuple(self.header))
 
     def display(self, name: Optional[str] = 'default') -> str:
         from openatlas.util.display import uc_first
         if not self.rows:
             return Markup('<p>' + uc_first(_('no entries')) + '</p>')
-        columns: List[Dict[str, str]] = [
-            {'title': _(item).capitalize() if item else ''} for item in self.header]
-        columns += [{'title': ''} for i in range(len(self.rows[0]) - len(self.header))]  # Add empty
+        columns = translated_columns(tuple(self.header), len(self.rows[0]), str(get_locale()))
+        page_length = current_user.settings['table_rows']  # One proxy dispatch, used twice
         data_table = {
             'data': self.rows,
             'stateSave': 'true',
-            'columns': columns,
+            'columns': list(columns),  # orjson needs a list, it treats tuples as unknown types
             'paging': self.paging,
-            'pageLength': current_user.settings['table_rows'],
+            'pageLength': page_length,
             'autoWidth': 'false'}
         if self.order:
             data_table['order'] = self.order
         if self.defs:
             data_table['columnDefs'] = self.defs
-        html = """
+        # CSS is only emitted when header or toolbar actually need hiding
+        css = []
+        if not self.header:
+            css.append(f'#{name}_table_wrapper .row:first-of-type {{ display:none; }}')
+        if len(self.rows) <= page_length:
+            css.append(f'#{name}_table_wrapper .row:last-of-type {{ display:none; }}')
+        style = f'<style type="text/css">{" ".join(css)}</style>' if css else ''
+        # The DataTable wiring lives in static/js/functions.js (initTable), so
+        # only the config JSON and a one line call are emitted per table
+        return Markup(f"""
             <table id="{name}_table" class="table table-striped hover" style="width:100%"></table>
-            <script>
-                $(document).ready(function() {{ 
-                    $('#{name}_table').DataTable({data_table});
-                    overflow();
-                    $('#{name}_table').on( 'page.dt', () => overflow());
-                    $('#{name}_table').on( 'search.dt', () => overflow());
-                }});                
-            </script>""".format(name=name, data_table=json.dumps(data_table))
-
-        # Toggle header and footer HTML
-        css_header = '#{name}_table_wrapper .row:first-of-type {{ display:none; }}'.format(
-            name=name)
-        css_toolbar = '#{name}_table_wrapper .row:last-of-type {{ display:none; }}'.format(
-            name=name)
-        html += '<style type="text/css">{header} {toolbar}</style>'.format(
-            header=css_header if not self.header else '',
-            toolbar=css_toolbar if len(self.rows) <= current_user.settings['table_rows'] else '')
-        return Markup(html)
+            <script type="application/json" id="{name}_cfg">{dumps(data_table)}</script>
+            <script>initTable('{name}');</script>{style}""")
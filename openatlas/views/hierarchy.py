@@ -6,7 +6,7 @@ from flask_wtf import FlaskForm
 from werkzeug.utils import redirect
 from werkzeug.wrappers import Response
 
-from openatlas import app, logger
+from openatlas import app, bootstrap, logger
 from openatlas.database.connect import Transaction
 from openatlas.forms.form import build_form
 from openatlas.models.entity import Entity
@@ -98,6 +98,7 @@ def hierarchy_delete(id_: int) -> Response:
     if node.standard or node.subs or node.count:
         abort(403)
     node.delete()
+    bootstrap.invalidate()
     flash(_('entity deleted'), 'info')
     return redirect(url_for('node_index'))
 
@@ -5,7 +5,7 @@ from flask_babel import lazy_gettext as _
 from werkzeug.utils import redirect
 from werkzeug.wrappers import Response
 
-from openatlas import app
+from openatlas import app, bootstrap
 from openatlas.database.connect import Transaction
 from openatlas.forms.form import build_move_form
 from openatlas.models.entity import Entity
@@ -46,6 +46,7 @@ def node_delete(id_: int) -> Response:
     if node.standard or node.subs or node.count or (root and root.locked):
         abort(403)
     node.delete()
+    bootstrap.invalidate()
     flash(_('entity deleted'), 'info')
     return redirect(url_for('entity_view', id_=root.id) if root else url_for('node_index'))
 